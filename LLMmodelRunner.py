@@ -1,19 +1,68 @@
 from transformers import pipeline
 import random
 
+SENTIMENT_MODEL = "cardiffnlp/twitter-roberta-base-sentiment-latest"
+CLASSIFICATION_MODEL = "facebook/bart-large-mnli"
+
+
+class RumorClassifier:
+    """
+    Keeps the sentiment and zero-shot pipelines loaded so repeated rumors skip model start-up.
+    Pipelines are created on first use; classify_many() runs a whole batch of rumors per pipeline call.
+    """
+
+    def __init__(self, relevance_threshold=0.5):
+        self.relevance_threshold = relevance_threshold
+        self._sentiment_pipe = None
+        self._classification_pipe = None
+
+    def _load(self):
+        if self._sentiment_pipe is None:
+            self._sentiment_pipe = pipeline("text-classification", model=SENTIMENT_MODEL, return_all_scores=True)
+            self._classification_pipe = pipeline("zero-shot-classification", model=CLASSIFICATION_MODEL)
+
+    def classify_many(self, rumors, street_names=None):
+        """
+        Returns one (overall_sentiment, relevant_streets, sentiment_results) tuple per rumor.
+        """
+        rumors = list(rumors)
+        if not rumors:
+            return []
+        self._load()
+        results = []
+        for sentiment_scores in self._sentiment_pipe(rumors):
+            sentiment_results = {entry["label"]: entry["score"] for entry in sentiment_scores}
+            overall_sentiment = "negative" if sentiment_results.get("negative", 0) > sentiment_results.get("positive", 0) else "neutral"
+            results.append((overall_sentiment, [], sentiment_results))
+
+        if street_names:
+            classifications = self._classification_pipe(rumors, candidate_labels=list(street_names))
+            if isinstance(classifications, dict):
+                classifications = [classifications]
+            for i, classification_result in enumerate(classifications):
+                relevant_streets = [street for street, score in zip(classification_result["labels"], classification_result["scores"])
+                                    if score > self.relevance_threshold]
+                results[i] = (results[i][0], relevant_streets, results[i][2])
+        return results
+
+
+_classifier = None
+
+
+def get_rumor_classifier():
+    global _classifier
+    if _classifier is None:
+        _classifier = RumorClassifier()
+    return _classifier
+
+
 def propagate_rumor(model, rumor):
     iterations = model.iteration_bunch(1)
     statuses = iterations[-1]["status"]
     return statuses
 
 def evaluate_rumor_with_llm(rumor, street_names):
-    sentiment_pipe = pipeline("text-classification", model="cardiffnlp/twitter-roberta-base-sentiment-latest", return_all_scores=True)
-    classification_pipe = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
-    sentiment_scores = sentiment_pipe(rumor)[0]
-    sentiment_results = {entry["label"]: entry["score"] for entry in sentiment_scores}
-    overall_sentiment = "negative" if sentiment_results.get("negative", 0) > sentiment_results.get("positive", 0) else "neutral"
-    classification_result = classification_pipe(rumor, candidate_labels=street_names)
-    relevant_streets = [street for street, score in zip(classification_result["labels"], classification_result["scores"]) if score > 0.5]
+    overall_sentiment, relevant_streets, sentiment_results = get_rumor_classifier().classify_many([rumor], street_names)[0]
     print(f"Relevant Streets: {relevant_streets}")
     print(f"Sentiment Results: {sentiment_results}")
     print(f"Overall Sentiment: {overall_sentiment}")
@@ -0,0 +1,141 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from results_store import ResultsStore
+
+
+def run_table(store):
+    """
+    One row per recorded run. Only negative rumors spread and make vehicles avoid their edges, and
+    main.py records only those in `rumors`, so runs without any are the baseline even if neutral
+    rumors were injected.
+
+    `counting` is how street_crossings was filled: "traci" runs hold vehicle-ticks on each edge,
+    "sumo-output" runs the vehicles that entered it. Runs from before the option are traci runs.
+    """
+    runs = pd.DataFrame(store.runs(), columns=["run_number", "run_id", "rumor_edges", "rumors", "metadata"])
+    runs["is_rumor"] = runs["rumors"].map(len) > 0
+    runs["counting"] = runs["metadata"].map(lambda metadata: metadata.get("counting", "traci"))
+    return runs
+
+
+def iter_edge_chunks(store, runs, chunk_edges=500):
+    """
+    Yield (edges, streets, counts) column chunks: counts is a runs x edges matrix for `chunk_edges`
+    edges at a time, so the whole runs x edges table never has to be in memory at once.
+    Edges missing from a run count as 0.
+    """
+    run_positions = pd.Series(np.arange(len(runs)), index=runs["run_id"])
+    edges = [row[0] for row in store.connection.execute("SELECT DISTINCT edge FROM street_crossings ORDER BY edge")]
+    for start in range(0, len(edges), chunk_edges):
+        chunk = edges[start:start + chunk_edges]
+        df = pd.read_sql_query(
+            f"SELECT run_id, edge, street, count FROM street_crossings WHERE edge IN ({','.join('?' * len(chunk))})",
+            store.connection, params=chunk
+        )
+        counts = np.zeros((len(runs), len(chunk)), dtype=np.float64)
+        rows = run_positions.reindex(df["run_id"]).to_numpy()
+        cols = pd.Categorical(df["edge"], categories=chunk).codes
+        known = ~np.isnan(rows)
+        np.add.at(counts, (rows[known].astype(np.intp), cols[known]), df["count"].to_numpy()[known])
+        streets = df.groupby("edge")["street"].first().reindex(chunk).fillna("Unknown Street")
+        yield chunk, streets.to_numpy(), counts
+
+
+def edge_statistics(store, confidence=0.95, chunk_edges=500, counting="traci"):
+    """
+    Per-edge mean, variance and confidence interval over the runs counted with `counting`, plus
+    rumor and baseline means and their difference. The two counting methods measure different
+    things, so their runs are never mixed.
+    """
+    runs = run_table(store)
+    runs = runs[runs["counting"] == counting].reset_index(drop=True)
+    rumor = runs["is_rumor"].to_numpy()
+    n = len(runs)
+    t_value = stats.t.ppf(0.5 + confidence / 2, df=max(n - 1, 1))
+    frames = []
+    for edges, streets, counts in iter_edge_chunks(store, runs, chunk_edges):
+        mean = counts.mean(axis=0)
+        var = counts.var(axis=0, ddof=1) if n > 1 else np.full(len(edges), np.nan)
+        half_width = t_value * np.sqrt(var / n)
+        with np.errstate(invalid="ignore"):
+            rumor_mean = counts[rumor].mean(axis=0) if rumor.any() else np.full(len(edges), np.nan)
+            baseline_mean = counts[~rumor].mean(axis=0) if (~rumor).any() else np.full(len(edges), np.nan)
+        frames.append(pd.DataFrame({
+            "edge": edges,
+            "street": streets,
+            "base_edge": pd.Series(edges).str.lstrip("-").to_numpy(),
+            "runs": n,
+            "mean": mean,
+            "var": var,
+            "ci_low": mean - half_width,
+            "ci_high": mean + half_width,
+            "rumor_mean": rumor_mean,
+            "baseline_mean": baseline_mean,
+            "delta": rumor_mean - baseline_mean,
+        }))
+    if not frames:
+        return pd.DataFrame(columns=["edge", "street", "base_edge", "runs", "mean", "var", "ci_low", "ci_high",
+                                     "rumor_mean", "baseline_mean", "delta"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def base_edge_deltas(edge_stats):
+    """
+    Rumor-versus-baseline deltas with both directions of a road (edge and -edge) added together,
+    the same pairing main.py uses for its grouped statistics.
+    """
+    return (edge_stats.groupby("base_edge", sort=False)
+            .agg(street=("street", "first"), rumor_mean=("rumor_mean", "sum"),
+                 baseline_mean=("baseline_mean", "sum"), delta=("delta", "sum"))
+            .sort_values("delta", ascending=False))
+
+
+def top_diverted_streets(edge_stats, k=10):
+    """
+    The k streets that gained the most traffic in rumor runs, and the k that lost the most.
+    """
+    by_street = edge_stats.groupby("street")["delta"].sum()
+    return by_street.nlargest(k), by_street.nsmallest(k)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cross-run street statistics from the results store")
+    parser.add_argument("--db", default="results.sqlite")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--chunk-edges", type=int, default=500, help="edges loaded per column chunk")
+    parser.add_argument("--counting", choices=("traci", "sumo-output"), default="traci",
+                        help="analyse the runs counted this way (vehicle-ticks or vehicles entered)")
+    parser.add_argument("--output-dir", help="also write the tables as CSV files here")
+    args = parser.parse_args()
+
+    with ResultsStore(args.db) as store:
+        runs = run_table(store)
+        edge_stats = edge_statistics(store, confidence=args.confidence, chunk_edges=args.chunk_edges,
+                                     counting=args.counting)
+    other = runs[runs["counting"] != args.counting]
+    runs = runs[runs["counting"] == args.counting]
+    print(f"{len(runs)} {args.counting} runs ({int(runs['is_rumor'].sum())} with rumors), {len(edge_stats)} edges")
+    if len(other):
+        print(f"Skipped {len(other)} runs counted with {', '.join(sorted(other['counting'].unique()))}.")
+
+    grouped = base_edge_deltas(edge_stats)
+    gained, lost = top_diverted_streets(edge_stats, args.top_k)
+    with pd.option_context("display.width", 160, "display.max_columns", 20):
+        print("\nRumor vs. baseline by base edge:")
+        print(grouped.head(args.top_k))
+        print(f"\nTop {args.top_k} streets traffic was diverted to:")
+        print(gained)
+        print(f"\nTop {args.top_k} streets traffic was diverted away from:")
+        print(lost)
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+        edge_stats.to_csv(os.path.join(args.output_dir, "edge_statistics.csv"), index=False)
+        grouped.to_csv(os.path.join(args.output_dir, "base_edge_deltas.csv"))
+        print(f"\nTables written to {args.output_dir}.")
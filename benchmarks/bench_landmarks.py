@@ -0,0 +1,64 @@
+"""
+Query latency of plain Dijkstra, geometric A* and ALT (landmark A*) on a SUMO net.
+
+    python benchmarks/bench_landmarks.py -n osm.net.xml --queries 1000 --blocked 20
+
+Every query blocks a fresh random set of edges, like the dangerous_edges of a rumor, and all
+three searches must return routes of the same travel time.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from edgeRouter import EdgeRouter, get_landmark_router  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--net", default="osm.net.xml")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--blocked", type=int, default=20, help="blocked edges per query")
+    parser.add_argument("--landmarks", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    router = get_landmark_router(args.net, landmark_count=args.landmarks)
+    print(f"Landmark preprocessing/loading: {time.perf_counter() - start:.2f} s "
+          f"({router.index.edge_count} edges, {len(router.landmarks)} landmarks)")
+
+    rng = random.Random(args.seed)
+    edge_ids = router.index.edge_ids
+    queries = []
+    for _ in range(args.queries):
+        from_edge, to_edge = rng.sample(edge_ids, 2)
+        blocked = router.blocked_mask(set(rng.sample(edge_ids, args.blocked)) - {from_edge, to_edge})
+        queries.append((from_edge, to_edge, blocked))
+
+    # A separate EdgeRouter so "astar" really uses the geometric bound, not the landmark one
+    plain = EdgeRouter(router.index)
+    searches = {
+        "dijkstra": lambda q: plain.route(*q, use_astar=False),
+        "astar": lambda q: plain.route(*q),
+        "alt": lambda q: router.route(*q),
+    }
+    costs = {}
+    for name, search in searches.items():
+        start = time.perf_counter()
+        routes = [search(q) for q in queries]
+        elapsed = time.perf_counter() - start
+        costs[name] = [None if r is None else round(sum(router.cost[router.index.edge_index[e]] for e in r[1:]), 6)
+                       for r in routes]
+        print(f"{name:<10}{1000 * elapsed / len(queries):>10.3f} ms/query")
+
+    mismatches = sum(a != b for a, b in zip(costs["dijkstra"], costs["alt"]))
+    mismatches += sum(a != b for a, b in zip(costs["dijkstra"], costs["astar"]))
+    print(f"Route cost mismatches against Dijkstra: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
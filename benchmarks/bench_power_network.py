@@ -0,0 +1,99 @@
+"""
+Times building the traffic-light power network.
+
+    python benchmarks/bench_power_network.py -n osm.net.xml --repeat 5
+
+"xml" parses the net file with the get_*_from_sumo helpers and builds from the dicts, "index"
+builds from an already cached NetworkIndex, and "per-add" is the old construction with one
+network.add call per bus, load and line (skip it with --no-per-add on large nets).
+"""
+import argparse
+import logging
+import math
+import os
+import statistics
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pypsa  # noqa: E402
+
+from network_utils import load_network_index  # noqa: E402
+from powerNetworkGen import (  # noqa: E402
+    create_power_network,
+    create_power_network_from_index,
+    get_road_edges_from_sumo,
+    get_traffic_lights_from_sumo,
+)
+
+
+def create_power_network_per_add(traffic_light_nodes, road_edges, feeders=2):
+    network = pypsa.Network()
+    network.add("Bus", name="MainPowerGrid", v_nom=230)
+    network.add("Generator", name="MainGenerator", bus="MainPowerGrid", p_nom=50, control="Slack")
+    network.add("Bus", name="LocalSubstation", v_nom=20)
+    network.add("Transformer", name="GridTransformer", bus0="MainPowerGrid", bus1="LocalSubstation",
+                s_nom=100, v_nom0=230, v_nom1=20, x=0.1, r=0.01)
+    sumo_to_label = {}
+    for i, (sumo_id, (x, y)) in enumerate(traffic_light_nodes.items(), start=1):
+        label = f"N{i}"
+        sumo_to_label[sumo_id] = label
+        network.add("Bus", name=label, v_nom=20, x=x, y=y)
+        network.add("Load", name=f"load_{label}", bus=label, p_set=0.02)
+    for label in list(sumo_to_label.values())[:feeders]:
+        network.add("Line", name=f"Feeder_{label}", bus0="LocalSubstation", bus1=label, length=0.1,
+                    r=0.00003, x=0.00004)
+    for s_from, s_to in road_edges:
+        if s_from in sumo_to_label and s_to in sumo_to_label:
+            (x1, y1), (x2, y2) = traffic_light_nodes[s_from], traffic_light_nodes[s_to]
+            dist_km = math.hypot(x2 - x1, y2 - y1) / 1000.0
+            network.add("Line", name=f"{sumo_to_label[s_from]}-{sumo_to_label[s_to]}",
+                        bus0=sumo_to_label[s_from], bus1=sumo_to_label[s_to], length=dist_km,
+                        r=0.0003 * dist_km, x=0.0004 * dist_km)
+    return network
+
+
+def timed(build, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        network = build()
+        times.append(time.perf_counter() - start)
+    network = network[0] if isinstance(network, tuple) else network
+    return statistics.median(times), len(network.buses), len(network.lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--net", default="osm.net.xml")
+    parser.add_argument("--feeders", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-per-add", action="store_true", help="skip the per-component baseline")
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+    logging.getLogger("pypsa").setLevel(logging.ERROR)
+
+    start = time.perf_counter()
+    index = load_network_index(args.net)
+    print(f"NetworkIndex parsed in {time.perf_counter() - start:.3f}s")
+
+    def from_xml():
+        return create_power_network(get_traffic_lights_from_sumo(args.net), get_road_edges_from_sumo(args.net),
+                                    feeders=args.feeders)
+
+    cases = [("xml", from_xml), ("index", lambda: create_power_network_from_index(index, feeders=args.feeders))]
+    if not args.no_per_add:
+        traffic_light_nodes = get_traffic_lights_from_sumo(args.net)
+        road_edges = get_road_edges_from_sumo(args.net)
+        cases.append(("per-add", lambda: create_power_network_per_add(traffic_light_nodes, road_edges, args.feeders)))
+
+    print(f"{'build':<10}{'median s':>10}{'buses':>8}{'lines':>8}")
+    for name, build in cases:
+        seconds, buses, lines = timed(build, 1 if name == "per-add" else args.repeat)
+        print(f"{name:<10}{seconds:>10.3f}{buses:>8}{lines:>8}")
+
+
+if __name__ == "__main__":
+    main()
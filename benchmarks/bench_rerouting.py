@@ -0,0 +1,125 @@
+"""
+Compares the reroute modes of dynamicPathing on the same SUMO scenario.
+
+    python benchmarks/bench_rerouting.py -n osm.net.xml -r osm.rou.xml --steps 1000
+
+Rumors are synthetic: at --rumor-tick each one marks two of the busiest route edges as dangerous
+and infects a fixed share of the social network, so every mode sees the same danger sets.
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+import xml.etree.ElementTree as ET
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import traci  # noqa: E402
+
+from dynamicPathing import EdgePenaltyRerouter, RerouteScheduler, reroute_vehicle_with_multiple_rumors  # noqa: E402
+from edgeRouter import ShortestPathTreeCache, get_router  # noqa: E402
+
+
+class SyntheticRumor:
+    def __init__(self, related_edges, node_count, infected_fraction, rng):
+        self.related_edges = related_edges
+        self.status = {node: int(rng.random() < infected_fraction) for node in range(node_count)}
+
+
+class RerouteCounter(io.StringIO):
+    """
+    Swallows the per-vehicle prints of the router mode while counting the reroutes.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.reroutes = 0
+
+    def write(self, s):
+        self.reroutes += s.count("rerouted to avoid")
+        return len(s)
+
+
+def busiest_edges(route_file, count):
+    usage = Counter()
+    for route in ET.parse(route_file).getroot().iter("route"):
+        edges = route.get("edges", "").split()
+        usage.update(edges[1:-1])
+    return [edge for edge, _ in usage.most_common(count)]
+
+
+def run(mode, args):
+    rng = random.Random(args.seed)
+    candidates = busiest_edges(args.routes, 2 * args.rumors)
+    router = get_router(args.net)
+    path_cache = ShortestPathTreeCache(router)
+    penalty_rerouter = None
+    if mode.startswith("effort"):
+        penalty_rerouter = EdgePenaltyRerouter(args.net, scope=mode.split("-")[1])
+    reroute_scheduler = None
+    if mode == "scheduled":
+        reroute_scheduler = RerouteScheduler(router, path_cache, max_reroutes=args.max_reroutes)
+
+    traci.start(["sumo", "-n", args.net, "-r", args.routes, "--no-step-log", "--no-warnings",
+                 "--seed", str(args.seed)])
+    vehicle_to_node = {}
+    rumors = []
+    counter = RerouteCounter()
+    reroute_time = 0.0
+    start = time.perf_counter()
+    try:
+        for tick in range(args.steps):
+            if traci.simulation.getMinExpectedNumber() <= 0:
+                break
+            traci.simulationStep()
+            for vehicle_id in traci.simulation.getDepartedIDList():
+                vehicle_to_node[vehicle_id] = len(vehicle_to_node) % args.nodes
+            if tick == args.rumor_tick:
+                rumors = [SyntheticRumor(candidates[2 * i:2 * i + 2], args.nodes, args.infected, rng)
+                          for i in range(args.rumors)]
+
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(counter):
+                if penalty_rerouter is not None:
+                    penalty_rerouter.step(rumors, vehicle_to_node)
+                elif reroute_scheduler is not None:
+                    reroute_scheduler.step(rumors, vehicle_to_node)
+                else:
+                    for vehicle_id in traci.vehicle.getIDList():
+                        reroute_vehicle_with_multiple_rumors(vehicle_id, rumors, vehicle_to_node,
+                                                             router=router, path_cache=path_cache)
+            reroute_time += time.perf_counter() - t0
+        ticks = tick + 1
+    finally:
+        traci.close()
+    total = time.perf_counter() - start
+    reroutes = penalty_rerouter.reroutes if penalty_rerouter is not None else counter.reroutes
+    return ticks, total, reroute_time, reroutes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--net", default="osm.net.xml")
+    parser.add_argument("-r", "--routes", default="osm.rou.xml")
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--nodes", type=int, default=300, help="social network size")
+    parser.add_argument("--rumors", type=int, default=2)
+    parser.add_argument("--rumor-tick", type=int, default=50)
+    parser.add_argument("--infected", type=float, default=0.5, help="share of infected nodes per rumor")
+    parser.add_argument("--modes", default="router,scheduled,effort-vehicle,effort-global")
+    parser.add_argument("--max-reroutes", type=int, default=20, help="scheduled mode: reroutes per tick")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'mode':<16}{'ticks':>8}{'wall s':>10}{'reroute s':>12}{'ms/tick':>10}{'reroutes':>10}")
+    for mode in args.modes.split(","):
+        ticks, total, reroute_time, reroutes = run(mode, args)
+        print(f"{mode:<16}{ticks:>8}{total:>10.2f}{reroute_time:>12.2f}{1000 * reroute_time / ticks:>10.3f}{reroutes:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Times step mode against scenario mode of the power network simulation on one failure trajectory
+and checks that both give the same bus voltages.
+
+    python benchmarks/bench_scenarios.py -n osm.net.xml --steps 50 --seed 1
+
+"step" advances the failures and solves each step with a PowerFlowCache like run_simulation,
+"scenario" samples the trajectory and solves it with solve_failure_scenarios like
+run_scenario_simulation.
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import random
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from powerNetwork import (  # noqa: E402
+    PowerFlowCache,
+    advance_failures,
+    sample_failure_trajectory,
+    solve_failure_scenarios,
+)
+from powerNetworkGen import (  # noqa: E402
+    create_power_network,
+    get_road_edges_from_sumo,
+    get_traffic_lights_from_sumo,
+)
+
+
+def step_mode(network, steps, seed):
+    rng = random.Random(seed)
+    pf_cache = PowerFlowCache()
+    down_nodes = set()
+    trajectory = []
+    v_mag_pu = np.zeros((len(network.buses), steps))
+    for t in range(steps):
+        advance_failures(network, down_nodes, rng)
+        trajectory.append(set(down_nodes))
+        pf_cache.solve(network, down_nodes)
+        v_mag_pu[:, t] = network.buses_t.v_mag_pu.iloc[-1].reindex(network.buses.index, fill_value=0.0)
+    return trajectory, v_mag_pu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--net", default="osm.net.xml")
+    parser.add_argument("--feeders", type=int, default=3)
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--tolerance", type=float, default=1e-6)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+    logging.getLogger("pypsa").setLevel(logging.ERROR)
+
+    traffic_light_nodes = get_traffic_lights_from_sumo(args.net)
+    road_edges = get_road_edges_from_sumo(args.net)
+
+    def build():
+        return create_power_network(traffic_light_nodes, road_edges, feeders=args.feeders)[0]
+
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        network = build()
+        start = time.perf_counter()
+        step_trajectory, step_v = step_mode(network, args.steps, args.seed)
+        step_seconds = time.perf_counter() - start
+
+        network = build()
+        start = time.perf_counter()
+        trajectory = sample_failure_trajectory(network, args.steps, args.seed)
+        _, scenario_v, _, converged = solve_failure_scenarios(network, trajectory)
+        scenario_seconds = time.perf_counter() - start
+
+    print(f"{'mode':<10}{'seconds':>10}")
+    print(f"{'step':<10}{step_seconds:>10.3f}")
+    print(f"{'scenario':<10}{scenario_seconds:>10.3f}")
+    print(f"Trajectories match: {step_trajectory == trajectory}; "
+          f"{int(converged.sum())}/{len(converged)} scenarios converged")
+    difference = np.abs(np.nan_to_num(scenario_v) - step_v)
+    mismatches = int((difference.max(axis=0) > args.tolerance).sum())
+    print(f"Steps with voltages differing by more than {args.tolerance}: {mismatches} "
+          f"(max difference {difference.max():.2e} p.u.)")
+
+
+if __name__ == "__main__":
+    main()
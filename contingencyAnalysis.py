@@ -0,0 +1,225 @@
+"""
+N-1 and sampled N-k contingency screening for the traffic-light power network.
+
+    python contingencyAnalysis.py -n osm.net.xml --workers 4
+    python contingencyAnalysis.py -n osm.net.xml -k 2 --samples 500 -o contingencies.csv
+
+Every contingency takes a set of buses, lines or transformers out of service. A connectivity screen
+finds the traffic lights cut off from the grid; power flow is then run only on the island that is
+still connected to a generator, to find under-voltage lights. Contingencies are sharded across a
+process pool and returned as a table ranked by the number of lights they leave unpowered.
+"""
+import argparse
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+from powerNetworkGen import create_power_network, get_road_edges_from_sumo, get_traffic_lights_from_sumo
+
+class ContingencyScreen:
+    """
+    Branch list of the network as bus positions, so the buses still energised after an outage are
+    one sparse connected_components call away.
+    """
+
+    def __init__(self, network):
+        self.buses = network.buses.index
+        self.branch_kinds = np.array(["Line"] * len(network.lines) + ["Transformer"] * len(network.transformers))
+        self.branch_names = np.array(list(network.lines.index) + list(network.transformers.index), dtype=object)
+        self.branch_position = {(kind, name): i for i, (kind, name) in enumerate(zip(self.branch_kinds, self.branch_names))}
+        self.bus0 = self.buses.get_indexer(list(network.lines["bus0"]) + list(network.transformers["bus0"]))
+        self.bus1 = self.buses.get_indexer(list(network.lines["bus1"]) + list(network.transformers["bus1"]))
+        self.sources = self.buses.get_indexer(network.generators["bus"].unique())
+        self.lights = np.zeros(len(self.buses), dtype=bool)
+        self.lights[self.buses.get_indexer(network.loads["bus"].unique())] = True
+
+    def energised(self, down_buses=(), out_branches=()):
+        """
+        Mask of buses connected to a generator bus once `down_buses` and `out_branches` (positions) are out.
+        """
+        up = np.ones(len(self.buses), dtype=bool)
+        up[list(down_buses)] = False
+        keep = up[self.bus0] & up[self.bus1]
+        keep[list(out_branches)] = False
+        adjacency = csr_matrix((np.ones(int(keep.sum()), dtype=np.int8), (self.bus0[keep], self.bus1[keep])),
+                               shape=(len(self.buses), len(self.buses)))
+        _, labels = connected_components(adjacency, directed=False)
+        live_sources = self.sources[up[self.sources]]
+        return up & np.isin(labels, labels[live_sources])
+
+    def split(self, contingency):
+        down_buses = [self.buses.get_loc(name) for kind, name in contingency if kind == "Bus"]
+        out_branches = [self.branch_position[(kind, name)] for kind, name in contingency if kind != "Bus"]
+        return down_buses, out_branches
+
+
+def contingency_elements(network, include_buses=True, include_branches=True):
+    """
+    Every element that can fail: buses without a generator, lines and transformers.
+    """
+    elements = []
+    if include_buses:
+        generator_buses = set(network.generators["bus"])
+        elements += [("Bus", bus) for bus in network.buses.index if bus not in generator_buses]
+    if include_branches:
+        elements += [("Line", line) for line in network.lines.index]
+        elements += [("Transformer", trafo) for trafo in network.transformers.index]
+    return elements
+
+
+def n_minus_1(network, include_buses=True, include_branches=True):
+    return [(element,) for element in contingency_elements(network, include_buses, include_branches)]
+
+
+def sample_n_minus_k(network, k, samples, seed=None, include_buses=True, include_branches=True):
+    """
+    Up to `samples` distinct random k-element contingencies.
+    """
+    rng = random.Random(seed)
+    elements = contingency_elements(network, include_buses, include_branches)
+    k = min(k, len(elements))
+    limit = min(samples, math.comb(len(elements), k))
+    seen = set()
+    while len(seen) < limit:
+        seen.add(tuple(sorted(rng.sample(elements, k))))
+    return sorted(seen)
+
+
+def evaluate_contingency(network, screen, contingency, v_min=0.95, run_pf=True):
+    """
+    Screen one contingency, then solve power flow on the energised island only.
+    """
+    down_buses, out_branches = screen.split(contingency)
+    energised = screen.energised(down_buses, out_branches)
+    unpowered = screen.lights & ~energised
+    row = {
+        "contingency": " + ".join(f"{kind} {name}" for kind, name in contingency),
+        "k": len(contingency),
+        "unpowered": int(unpowered.sum()),
+        "unpowered_lights": " ".join(screen.buses[unpowered]),
+        "under_voltage": np.nan,
+        "under_voltage_lights": "",
+        "min_v_mag_pu": np.nan,
+        "converged": np.nan,
+        "pf_seconds": 0.0,
+    }
+    live_lights = screen.lights & energised
+    if not run_pf or not live_lights.any():
+        return row
+
+    start = time.perf_counter()
+    dead = screen.buses[~energised]
+    island = network.copy()
+    out_lines = [screen.branch_names[i] for i in out_branches if screen.branch_kinds[i] == "Line"]
+    out_trafos = [screen.branch_names[i] for i in out_branches if screen.branch_kinds[i] == "Transformer"]
+    island.remove("Line", island.lines.index[island.lines["bus0"].isin(dead) | island.lines["bus1"].isin(dead)
+                                             | island.lines.index.isin(out_lines)])
+    island.remove("Transformer", island.transformers.index[
+        island.transformers["bus0"].isin(dead) | island.transformers["bus1"].isin(dead)
+        | island.transformers.index.isin(out_trafos)])
+    island.remove("Load", island.loads.index[island.loads["bus"].isin(dead)])
+    island.remove("Bus", dead)
+    try:
+        island.enforce_Q_limits = False
+        island.lpf()
+        info = island.pf()
+        converged = bool(info["converged"].to_numpy().all())
+    except Exception:
+        converged = False
+    row["converged"] = converged
+    row["pf_seconds"] = time.perf_counter() - start
+    if converged:
+        v = island.buses_t.v_mag_pu.iloc[-1].reindex(screen.buses[live_lights])
+        low = v[v < v_min]
+        row["under_voltage"] = len(low)
+        row["under_voltage_lights"] = " ".join(low.index)
+        row["min_v_mag_pu"] = float(v.min())
+    return row
+
+
+_worker = {}
+
+
+def _init_worker(network, v_min, run_pf):
+    _worker["network"] = network
+    _worker["screen"] = ContingencyScreen(network)
+    _worker["v_min"] = v_min
+    _worker["run_pf"] = run_pf
+
+
+def _evaluate_shard(contingencies):
+    return [evaluate_contingency(_worker["network"], _worker["screen"], contingency,
+                                 _worker["v_min"], _worker["run_pf"]) for contingency in contingencies]
+
+
+def run_contingency_analysis(network, contingencies, workers=None, v_min=0.95, run_pf=True, shard_size=None):
+    """
+    Evaluate `contingencies` (tuples of (kind, name) elements) across `workers` processes
+    (1 = in this process) and return the ranked criticality table.
+    """
+    contingencies = list(contingencies)
+    if workers == 1 or len(contingencies) <= 1:
+        _init_worker(network, v_min, run_pf)
+        rows = _evaluate_shard(contingencies)
+    else:
+        workers = workers or os.cpu_count() or 1
+        shard_size = shard_size or max(1, math.ceil(len(contingencies) / (4 * workers)))
+        shards = [contingencies[i:i + shard_size] for i in range(0, len(contingencies), shard_size)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(network, v_min, run_pf)) as executor:
+            rows = [row for shard in executor.map(_evaluate_shard, shards) for row in shard]
+    return rank_contingencies(pd.DataFrame(rows))
+
+
+def rank_contingencies(table):
+    """
+    Most critical first: most lights unpowered, then most under-voltage, then lowest voltage.
+    """
+    if table.empty:
+        return table
+    table = table.sort_values(["unpowered", "under_voltage", "min_v_mag_pu"],
+                              ascending=[False, False, True], na_position="last", kind="stable")
+    table.insert(0, "rank", np.arange(1, len(table) + 1))
+    return table.reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--net", default="osm.net.xml")
+    parser.add_argument("--feeders", type=int, default=3)
+    parser.add_argument("-k", type=int, default=1, help="elements out per contingency; k > 1 is sampled")
+    parser.add_argument("--samples", type=int, default=1000, help="contingencies sampled when k > 1")
+    parser.add_argument("--no-buses", action="store_true", help="only take lines and transformers out")
+    parser.add_argument("--no-branches", action="store_true", help="only take buses out")
+    parser.add_argument("--screen-only", action="store_true", help="skip power flow, connectivity only")
+    parser.add_argument("--v-min", type=float, default=0.95, help="under-voltage threshold in p.u.")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("-o", "--output", help="write the full ranked table as CSV")
+    args = parser.parse_args()
+
+    network, sumo_to_label, label_to_sumo = create_power_network(
+        get_traffic_lights_from_sumo(args.net), get_road_edges_from_sumo(args.net), feeders=args.feeders
+    )
+    if args.k == 1:
+        contingencies = n_minus_1(network, not args.no_buses, not args.no_branches)
+    else:
+        contingencies = sample_n_minus_k(network, args.k, args.samples, args.seed, not args.no_buses, not args.no_branches)
+
+    start = time.perf_counter()
+    table = run_contingency_analysis(network, contingencies, workers=args.workers, v_min=args.v_min,
+                                     run_pf=not args.screen_only)
+    print(f"{len(table)} contingencies (N-{args.k}) evaluated in {time.perf_counter() - start:.1f}s")
+    with pd.option_context("display.width", 160, "display.max_columns", 10, "display.max_colwidth", 60):
+        print(table.head(args.top)[["rank", "contingency", "unpowered", "under_voltage", "min_v_mag_pu", "converged"]])
+    if args.output:
+        table.to_csv(args.output, index=False)
+        print(f"Ranked table written to {args.output}.")
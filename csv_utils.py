@@ -1,18 +1,41 @@
-import os
+import argparse
+
 import pandas as pd
 
-def update_street_statistics_csv(data, rumor_street, csv_filename="street_crossings.csv"):
-    if os.path.exists(csv_filename):
-        existing_df = pd.read_csv(csv_filename)
-        existing_columns = existing_df.columns.tolist()
-        run_number = len(existing_columns)
-        new_run_col = f"Run {run_number}"
-        new_data_df = pd.DataFrame({"Street Names & Edge IDs": list(data.keys()), new_run_col: list(data.values())})
-        merged_df = existing_df.merge(new_data_df, on="Street Names & Edge IDs", how="outer")
-    else:
-        merged_df = pd.DataFrame({"Street Names & Edge IDs": list(data.keys()), "Run 1": list(data.values())})
+from results_store import ResultsStore
+
+
+def export_street_statistics_csv(store, csv_filename="street_crossings.csv"):
+    """
+    Write the wide street_crossings.csv (one "Run N" column per run and a closing "Rumor Injected" row)
+    from the long-format results store.
+    """
+    runs = store.runs()
+    long_df = pd.read_sql_query(
+        "SELECT r.run_number, c.edge, c.street, c.count FROM street_crossings c "
+        "JOIN runs r ON r.run_id = c.run_id",
+        store.connection
+    )
+    long_df["Street Names & Edge IDs"] = long_df["street"].fillna("Unknown Street") + " (" + long_df["edge"] + ")"
+    wide_df = long_df.pivot_table(index="Street Names & Edge IDs", columns="run_number", values="count",
+                                  aggfunc="sum", sort=False)
+    wide_df = wide_df.reindex(columns=[n for n, *_ in runs])
+    wide_df.columns = [f"Run {i}" for i in range(1, len(wide_df.columns) + 1)]
+    wide_df = wide_df.reset_index()
+
+    rumor_row = {"Street Names & Edge IDs": "Rumor Injected"}
+    for i, (_, _, rumor_edges, _, _) in enumerate(runs, start=1):
+        rumor_row[f"Run {i}"] = str(rumor_edges)
+    wide_df = pd.concat([wide_df, pd.DataFrame([rumor_row])], ignore_index=True)
+    wide_df.to_csv(csv_filename, index=False)
+    return wide_df
+
 
-    rumor_row = pd.DataFrame({"Street Names & Edge IDs": ["Rumor Injected"], f"Run {len(merged_df.columns) - 1}": rumor_street}, index=[len(merged_df)])
-    merged_df = pd.concat([merged_df, rumor_row], ignore_index=True)
-    merged_df.to_csv(csv_filename, index=False)
-    return merged_df
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the results store as the wide street_crossings.csv")
+    parser.add_argument("--db", default="results.sqlite")
+    parser.add_argument("-o", "--output", default="street_crossings.csv")
+    args = parser.parse_args()
+    with ResultsStore(args.db) as store:
+        export_street_statistics_csv(store, args.output)
+    print(f"Exported {args.output}.")
@@ -0,0 +1,183 @@
+"""
+DC power flow with precomputed PTDF and LODF matrices for fast outage screening.
+
+    python dcPowerFlow.py -n osm.net.xml --outages 50
+
+The susceptance matrix of the network's lines and transformers is built and factorised once; after
+that, base flows are one PTDF product and the flows after a single or small multi-branch outage are
+a correction from a few columns of the branch-to-branch PTDF, no re-solve needed. The __main__
+block checks both against PyPSA's lpf().
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csc_matrix, diags
+from scipy.sparse.linalg import splu
+
+from powerNetworkGen import create_power_network, get_road_edges_from_sumo, get_traffic_lights_from_sumo
+
+# An outage set whose coupling matrix has a singular value below this splits the network
+ISLANDING_TOLERANCE = 1e-8
+
+
+class DCPowerFlow:
+    """
+    Linear (DC) power flow of a PyPSA network: flows = PTDF @ injections, with the slack bus
+    balancing. Branches are the lines followed by the transformers; `branch_names` holds
+    (component, name) pairs in that order. Uses the same per-unit reactances as lpf().
+    """
+
+    def __init__(self, network):
+        network.calculate_dependent_values()
+        self.buses = network.buses.index
+        self.branch_names = ([("Line", name) for name in network.lines.index]
+                             + [("Transformer", name) for name in network.transformers.index])
+        self.branch_position = {branch: i for i, branch in enumerate(self.branch_names)}
+        bus0 = self.buses.get_indexer(list(network.lines["bus0"]) + list(network.transformers["bus0"]))
+        bus1 = self.buses.get_indexer(list(network.lines["bus1"]) + list(network.transformers["bus1"]))
+        x = np.concatenate([network.lines["x_pu_eff"].to_numpy(), network.transformers["x_pu_eff"].to_numpy()])
+        if np.any(x == 0):
+            zero = [self.branch_names[i] for i in np.flatnonzero(x == 0)[:5]]
+            raise ValueError(f"{int(np.sum(x == 0))} branches have zero reactance, e.g. {zero}")
+        self.susceptance = 1.0 / x
+
+        slack = network.generators.index[network.generators["control"] == "Slack"]
+        self.slack_bus = network.generators.at[slack[0], "bus"] if len(slack) else self.buses[0]
+        self.slack = self.buses.get_loc(self.slack_bus)
+        self.others = np.delete(np.arange(len(self.buses)), self.slack)
+
+        m, n = len(self.branch_names), len(self.buses)
+        rows = np.arange(m)
+        self.incidence = csc_matrix((np.concatenate([np.ones(m), -np.ones(m)]),
+                                     (np.concatenate([rows, rows]), np.concatenate([bus0, bus1]))), shape=(m, n))
+        weighted = diags(self.susceptance) @ self.incidence
+        b_bus = (self.incidence.T @ weighted).tocsc()
+        self._lu = splu(b_bus[self.others][:, self.others].tocsc())
+
+        ptdf = np.zeros((m, n))
+        ptdf[:, self.others] = self._lu.solve(weighted[:, self.others].T.toarray()).T
+        self.ptdf = ptdf
+        # Flow on every branch per MW moved from bus0 to bus1 of each branch
+        self.branch_ptdf = (self.incidence @ ptdf.T).T
+        self._lodf = None
+
+    @property
+    def lodf(self):
+        """
+        Line outage distribution factors: LODF[l, k] is the share of branch k's pre-outage flow that
+        moves onto branch l when k trips. Columns of branches whose outage islands the network are NaN.
+        """
+        if self._lodf is None:
+            diagonal = np.diag(self.branch_ptdf).copy()
+            with np.errstate(divide="ignore", invalid="ignore"):
+                lodf = self.branch_ptdf / (1.0 - diagonal)[None, :]
+            lodf[:, np.abs(1.0 - diagonal) < ISLANDING_TOLERANCE] = np.nan
+            np.fill_diagonal(lodf, -1.0)
+            self._lodf = lodf
+        return self._lodf
+
+    def injections(self, network, snapshot=None):
+        """
+        Net active power per bus from load and non-slack generator set-points (MW).
+        """
+        loads = network.loads["p_set"]
+        if snapshot is not None and not network.loads_t.p_set.empty:
+            loads = loads.copy()
+            varying = network.loads_t.p_set.loc[snapshot]
+            loads[varying.index] = varying
+        p = -loads.groupby(network.loads["bus"]).sum().reindex(self.buses, fill_value=0.0).to_numpy()
+        generators = network.generators[network.generators["control"] != "Slack"]
+        p += generators["p_set"].groupby(generators["bus"]).sum().reindex(self.buses, fill_value=0.0).to_numpy()
+        return p
+
+    def flows(self, p):
+        """
+        Branch flows (MW, bus0 -> bus1) for bus injections `p`; the slack bus takes the balance.
+        """
+        return self.ptdf @ p
+
+    def angles(self, p):
+        theta = np.zeros(len(self.buses))
+        theta[self.others] = self._lu.solve(p[self.others])
+        return theta
+
+    def outage_flows(self, base_flows, outages):
+        """
+        Flows after the branches in `outages` ((component, name) pairs or positions) trip together.
+        Returns None if the outage islands part of the network.
+        """
+        k = np.array([o if isinstance(o, (int, np.integer)) else self.branch_position[o] for o in outages])
+        if not len(k):
+            return base_flows.copy()
+        coupling = np.eye(len(k)) - self.branch_ptdf[np.ix_(k, k)]
+        if np.linalg.svd(coupling, compute_uv=False).min() < ISLANDING_TOLERANCE:
+            return None
+        flows = base_flows + self.branch_ptdf[:, k] @ np.linalg.solve(coupling, base_flows[k])
+        flows[k] = 0.0
+        return flows
+
+    def single_outage_flows(self, base_flows):
+        """
+        branch x outage matrix of post-outage flows for every single-branch outage at once.
+        """
+        flows = base_flows[:, None] + self.lodf * base_flows[None, :]
+        np.fill_diagonal(flows, 0.0)
+        return flows
+
+
+def lpf_flows(network, branch_names):
+    network.lpf()
+    flows = pd.concat([network.lines_t.p0.iloc[-1], network.transformers_t.p0.iloc[-1]])
+    return flows.reindex([name for _, name in branch_names]).to_numpy()
+
+
+def validate_against_lpf(network, outage_sets=(), dc=None):
+    """
+    Max absolute flow difference (MW) between DCPowerFlow and PyPSA lpf() for the base case and
+    for every outage set, solved by lpf() on a copy with the branches removed.
+    """
+    dc = dc or DCPowerFlow(network)
+    base = dc.flows(dc.injections(network))
+    errors = {"base": float(np.max(np.abs(base - lpf_flows(network.copy(), dc.branch_names))))}
+    for outages in outage_sets:
+        predicted = dc.outage_flows(base, outages)
+        if predicted is None:
+            continue
+        outaged = network.copy()
+        for component, name in outages:
+            outaged.remove(component, name)
+        reference = lpf_flows(outaged, dc.branch_names)
+        keep = ~np.isnan(reference)
+        errors[" + ".join(name for _, name in outages)] = float(np.max(np.abs(predicted[keep] - reference[keep])))
+    return errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--net", default="osm.net.xml")
+    parser.add_argument("--feeders", type=int, default=3)
+    parser.add_argument("--outages", type=int, default=20, help="random outages checked against lpf()")
+    parser.add_argument("-k", type=int, default=1, help="branches per checked outage")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    network, sumo_to_label, label_to_sumo = create_power_network(
+        get_traffic_lights_from_sumo(args.net), get_road_edges_from_sumo(args.net), feeders=args.feeders
+    )
+    start = time.perf_counter()
+    dc = DCPowerFlow(network)
+    base = dc.flows(dc.injections(network))
+    print(f"PTDF for {len(dc.branch_names)} branches x {len(dc.buses)} buses in {time.perf_counter() - start:.3f}s")
+
+    start = time.perf_counter()
+    all_single = dc.single_outage_flows(base)
+    print(f"All {all_single.shape[1]} single-branch outages in {time.perf_counter() - start:.3f}s")
+
+    rng = random.Random(args.seed)
+    outage_sets = [tuple(rng.sample(dc.branch_names, args.k)) for _ in range(args.outages)]
+    errors = validate_against_lpf(network, outage_sets, dc)
+    print(f"Max |DC - lpf| flow error: base {errors.pop('base'):.2e} MW, "
+          f"{len(errors)} outages {max(errors.values(), default=0.0):.2e} MW")
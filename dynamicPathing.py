@@ -1,36 +1,261 @@
+import time
+
 import traci
-import random
 
-def reroute_vehicle_with_multiple_rumors(vehicle_id, social_models, vehicle_to_node):
-    node_id = vehicle_to_node.get(vehicle_id)
-    if node_id is None:
-        print(f"Vehicle {vehicle_id} has no assigned node.")
-        return
+from edgeRouter import get_router
 
+REROUTE_MODES = ("router", "effort", "scheduled")
+
+
+def get_dangerous_edges(node_id, social_models):
     dangerous_edges = set()
     for social_model in social_models:
         if social_model.status.get(node_id, 0) == 1:
             dangerous_edges.update(social_model.related_edges)
+    return dangerous_edges
+
+
+def reroute_vehicle_with_multiple_rumors(vehicle_id, social_models, vehicle_to_node, router=None, path_cache=None):
+    node_id = vehicle_to_node.get(vehicle_id)
+    if node_id is None:
+        print(f"Vehicle {vehicle_id} has no assigned node.")
+        return
 
+    dangerous_edges = get_dangerous_edges(node_id, social_models)
     if not dangerous_edges:
         return
 
     route = traci.vehicle.getRoute(vehicle_id)
     route_index = traci.vehicle.getRouteIndex(vehicle_id)
     if route_index + 1 < len(route) and route[route_index + 1] in dangerous_edges:
-        current_edge = traci.vehicle.getRoadID(vehicle_id)
-        all_edges = traci.edge.getIDList()
-        safe_edges = [
-            edge for edge in all_edges
-            if current_edge in traci.simulation.findRoute(current_edge, edge).edges
-            and all(dangerous_edge not in traci.simulation.findRoute(current_edge, edge).edges for dangerous_edge in dangerous_edges)
-        ]
-        for new_edge in safe_edges:
-            route_result = traci.simulation.findRoute(current_edge, new_edge)
-            if route_result.edges and len(route_result.edges) > 1:
-                new_route = route_result.edges
-                traci.vehicle.setRoute(vehicle_id, new_route)
-                traci.vehicle.setColor(vehicle_id, (255, 0, 0, 255))
-                print(f"Vehicle {vehicle_id} rerouted to avoid {dangerous_edges}. New route: {new_route}")
+        set_safe_route(vehicle_id, route, route_index, dangerous_edges, router=router, path_cache=path_cache)
+
+
+def set_safe_route(vehicle_id, route, route_index, dangerous_edges, router=None, path_cache=None):
+    """
+    Replace the rest of the vehicle's route with the fastest one to its final edge that avoids
+    `dangerous_edges`. Returns True if the vehicle was rerouted.
+    """
+    # route[route_index] is the edge the vehicle is on (or just left, while crossing a junction)
+    current_edge = route[route_index]
+    destination = route[-1]
+    if path_cache is not None:
+        # vehicles sharing a destination and danger set reuse one shortest-path tree
+        new_route = path_cache.route(current_edge, destination, dangerous_edges)
+    else:
+        router = router or get_router()
+        new_route = router.route(current_edge, destination, blocked_edges=dangerous_edges)
+    if new_route and len(new_route) > 1:
+        try:
+            traci.vehicle.setRoute(vehicle_id, new_route)
+        except traci.TraCIException as e:
+            print(f"Could not reroute vehicle {vehicle_id}: {e}")
+            return False
+        traci.vehicle.setColor(vehicle_id, (255, 0, 0, 255))
+        print(f"Vehicle {vehicle_id} rerouted to avoid {dangerous_edges}. New route: {new_route}")
+        return True
+    print(f"No safe alternative routes found for vehicle {vehicle_id} to avoid {dangerous_edges}.")
+    return False
+
+
+class RerouteScheduler:
+    """
+    The "scheduled" reroute mode: caps reroute work per tick instead of rerouting every affected
+    vehicle at once when a rumor spreads.
+
+    Vehicles whose remaining route crosses one of their dangerous edges are queued by estimated
+    time until they reach it (remaining route length / current speed). Each tick the most urgent
+    ones are rerouted until `max_reroutes` or `time_budget` seconds are used up; the rest, and any
+    vehicle more than `horizon` seconds away from danger, wait for a later tick. The time budget
+    covers the whole tick, scan included, and at least the most urgent vehicle is always rerouted.
+    A waiting vehicle's estimate is counted down in simulation time and only measured again through
+    TraCI every `eta_refresh` seconds, so a large backlog costs no TraCI calls per tick. Every vehicle
+    remembers the danger-set version it was last handled for, so it is never rerouted twice for
+    the same danger.
+    """
+
+    def __init__(self, router=None, path_cache=None, max_reroutes=None, time_budget=None, horizon=120.0,
+                 min_speed=1.0, eta_refresh=10.0):
+        self.router = router or get_router()
+        self.path_cache = path_cache
+        self.max_reroutes = max_reroutes
+        self.time_budget = time_budget
+        self.horizon = horizon
+        self.min_speed = min_speed
+        self.eta_refresh = eta_refresh
+        self.routed_version = {}
+        # vehicle -> (danger version, eta, simulation time it was measured at)
+        self.eta_cache = {}
+        self.deferred_version = {}
+        # vehicles put off at least once, counted once per danger set; backlog is the last tick's queue
+        self.deferred = 0
+        self.backlog = 0
+        self.reroutes = 0
+        self._versions = {}
+
+    def danger_version(self, dangerous_edges):
+        return self._versions.setdefault(frozenset(dangerous_edges), len(self._versions))
+
+    def time_to_danger(self, vehicle_id, route, route_index, dangerous_edges):
+        """
+        Seconds until the vehicle enters its first dangerous edge, or None if its route avoids them.
+        """
+        edge_index, edge_length = self.router.index.edge_index, self.router.index.edge_length
+        distance = 0.0
+        if not traci.vehicle.getRoadID(vehicle_id).startswith(":"):
+            i = edge_index.get(route[route_index])
+            if i is not None:
+                distance = max(0.0, edge_length[i] - traci.vehicle.getLanePosition(vehicle_id))
+        for edge in route[route_index + 1:]:
+            if edge in dangerous_edges:
+                return distance / max(traci.vehicle.getSpeed(vehicle_id), self.min_speed)
+            i = edge_index.get(edge)
+            if i is not None:
+                distance += edge_length[i]
+        return None
+
+    def _defer(self, vehicle_id, version):
+        if self.deferred_version.get(vehicle_id) != version:
+            self.deferred_version[vehicle_id] = version
+            self.deferred += 1
+
+    def _handled(self, vehicle_id, version):
+        self.routed_version[vehicle_id] = version
+        self.deferred_version.pop(vehicle_id, None)
+        self.eta_cache.pop(vehicle_id, None)
+
+    def _eta(self, vehicle_id, dangerous_edges, version, now):
+        cached = self.eta_cache.get(vehicle_id)
+        if cached is not None and cached[0] == version and now - cached[2] < self.eta_refresh:
+            return cached[1] - (now - cached[2])
+        route = traci.vehicle.getRoute(vehicle_id)
+        eta = self.time_to_danger(vehicle_id, route, traci.vehicle.getRouteIndex(vehicle_id), dangerous_edges)
+        if eta is not None:
+            self.eta_cache[vehicle_id] = (version, eta, now)
+        return eta
+
+    def step(self, social_models, vehicle_to_node, vehicle_ids=None):
+        start = time.perf_counter()
+        if vehicle_ids is None:
+            vehicle_ids = traci.vehicle.getIDList()
+        for vehicle_id in traci.simulation.getArrivedIDList():
+            self.routed_version.pop(vehicle_id, None)
+            self.deferred_version.pop(vehicle_id, None)
+            self.eta_cache.pop(vehicle_id, None)
+
+        now = traci.simulation.getTime()
+        pending = []
+        waiting = []
+        for vehicle_id in vehicle_ids:
+            node_id = vehicle_to_node.get(vehicle_id)
+            if node_id is None:
+                continue
+            dangerous_edges = get_dangerous_edges(node_id, social_models)
+            if not dangerous_edges:
+                continue
+            version = self.danger_version(dangerous_edges)
+            if self.routed_version.get(vehicle_id) == version:
+                continue
+            eta = self._eta(vehicle_id, dangerous_edges, version, now)
+            if eta is None:
+                # the current route is already safe for this danger set
+                self._handled(vehicle_id, version)
+            elif self.horizon is None or eta <= self.horizon:
+                pending.append((eta, vehicle_id, dangerous_edges, version))
+            else:
+                waiting.append((vehicle_id, version))
+        pending.sort(key=lambda p: p[0])
+
+        for done, (_, vehicle_id, dangerous_edges, version) in enumerate(pending):
+            if ((self.max_reroutes is not None and done >= self.max_reroutes)
+                    or (done and self.time_budget is not None and time.perf_counter() - start >= self.time_budget)):
+                waiting.extend((p[1], p[3]) for p in pending[done:])
+                break
+            set_safe_route(vehicle_id, traci.vehicle.getRoute(vehicle_id), traci.vehicle.getRouteIndex(vehicle_id),
+                           dangerous_edges, router=self.router, path_cache=self.path_cache)
+            # also when no safe route exists, so hopeless vehicles don't eat every tick's budget
+            self._handled(vehicle_id, version)
+            self.reroutes += 1
+
+        for vehicle_id, version in waiting:
+            self._defer(vehicle_id, version)
+        self.backlog = len(waiting)
+
+
+class EdgePenaltyRerouter:
+    """
+    The "effort" reroute mode: instead of building routes in Python, the rumor's related_edges get a
+    prohibitive travel time once whenever a danger set changes, and the affected vehicles call
+    rerouteTraveltime so SUMO's own router finds the way around.
+
+    scope="vehicle": the penalty is a vehicle-level adapted travel time, set only for infected vehicles.
+    scope="global":  the penalty is the edge travel time seen by every vehicle, applied while any
+                     node is infected by the rumor.
+    """
+
+    def __init__(self, net_file="osm.net.xml", scope="vehicle", penalty=1e5):
+        if scope not in ("vehicle", "global"):
+            raise ValueError(f"Unknown penalty scope {scope!r}.")
+        self.scope = scope
+        self.penalty = penalty
+        self.router = get_router(net_file)
+        self.vehicle_edges = {}
+        self.global_edges = frozenset()
+        self.reroutes = 0
+
+    def _reroute_if_affected(self, vehicle_id, dangerous_edges):
+        route = traci.vehicle.getRoute(vehicle_id)
+        route_index = traci.vehicle.getRouteIndex(vehicle_id)
+        if not dangerous_edges.intersection(route[route_index + 1:]):
+            return
+        try:
+            traci.vehicle.rerouteTraveltime(vehicle_id, currentTravelTimes=False)
+        except traci.TraCIException as e:
+            print(f"Could not reroute vehicle {vehicle_id}: {e}")
+            return
+        traci.vehicle.setColor(vehicle_id, (255, 0, 0, 255))
+        self.reroutes += 1
+
+    def step(self, social_models, vehicle_to_node, vehicle_ids=None):
+        if vehicle_ids is None:
+            vehicle_ids = traci.vehicle.getIDList()
+        for vehicle_id in traci.simulation.getArrivedIDList():
+            self.vehicle_edges.pop(vehicle_id, None)
+
+        if self.scope == "global":
+            dangerous_edges = set()
+            for social_model in social_models:
+                if 1 in social_model.status.values():
+                    dangerous_edges.update(social_model.related_edges)
+            dangerous_edges = frozenset(dangerous_edges)
+            if dangerous_edges == self.global_edges:
+                # vehicles departing now still follow routes planned without the penalties
+                if dangerous_edges:
+                    for vehicle_id in traci.simulation.getDepartedIDList():
+                        self._reroute_if_affected(vehicle_id, dangerous_edges)
                 return
-        print(f"No safe alternative routes found for vehicle {vehicle_id} to avoid {dangerous_edges}.")
+            for edge in dangerous_edges - self.global_edges:
+                traci.edge.adaptTraveltime(edge, self.penalty)
+            for edge in self.global_edges - dangerous_edges:
+                # a negative value removes the override, so the edge goes back to its live travel time
+                traci.edge.adaptTraveltime(edge, -1)
+            self.global_edges = dangerous_edges
+            for vehicle_id in vehicle_ids:
+                self._reroute_if_affected(vehicle_id, dangerous_edges)
+            return
+
+        for vehicle_id in vehicle_ids:
+            node_id = vehicle_to_node.get(vehicle_id)
+            if node_id is None:
+                continue
+            dangerous_edges = frozenset(get_dangerous_edges(node_id, social_models))
+            previous = self.vehicle_edges.get(vehicle_id, frozenset())
+            if dangerous_edges == previous:
+                continue
+            for edge in dangerous_edges - previous:
+                traci.vehicle.setAdaptedTraveltime(vehicle_id, edge, self.penalty)
+            for edge in previous - dangerous_edges:
+                traci.vehicle.setAdaptedTraveltime(vehicle_id, edge)
+            self.vehicle_edges[vehicle_id] = dangerous_edges
+            if dangerous_edges:
+                self._reroute_if_affected(vehicle_id, dangerous_edges)
@@ -0,0 +1,322 @@
+import heapq
+import math
+import os
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from network_utils import load_network_index
+
+
+class EdgeRouter:
+    """
+    In-process shortest-path router over the edge graph of a NetworkIndex.
+
+    Graph nodes are SUMO edges, arcs are <connection>s, and entering an edge costs its free-flow
+    travel time. Blocked edges are masked out of the search, which replaces probing
+    traci.simulation.findRoute edge by edge.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.cost = index.edge_travel_time()
+        # Python lists are much faster than NumPy scalars inside the heap loop
+        self._cost = self.cost.tolist()
+        self._succ_ptr = index.succ_ptr.tolist()
+        self._succ_idx = index.succ_idx.tolist()
+
+        # A* lower bound: straight-line distance at the fastest speed in the net, scaled by the
+        # smallest length/straight-line ratio of any edge so junction-shortened lanes keep it admissible.
+        fx, fy = index.junction_x[index.edge_from], index.junction_y[index.edge_from]
+        tx, ty = index.junction_x[index.edge_to], index.junction_y[index.edge_to]
+        straight = np.hypot(tx - fx, ty - fy)
+        valid = (straight > 0) & (index.edge_from >= 0) & (index.edge_to >= 0)
+        ratio = float(np.min(index.edge_length[valid] / straight[valid], initial=1.0))
+        self._astar_scale = min(1.0, ratio) / float(np.max(index.edge_speed, initial=1.0))
+        self._end_x = np.where(index.edge_to >= 0, tx, np.nan).tolist()
+        self._end_y = np.where(index.edge_to >= 0, ty, np.nan).tolist()
+
+    def arc_matrix(self, blocked=None, reverse=False):
+        """
+        Sparse edge graph for scipy.sparse.csgraph: arc e -> n weighted by the cost of entering n.
+        Arcs touching a `blocked` edge are dropped; reverse=True flips every arc.
+        """
+        index = self.index
+        arc_from = np.repeat(np.arange(index.edge_count), np.diff(index.succ_ptr))
+        arc_to = index.succ_idx
+        # csgraph treats explicit zeros as missing arcs
+        weight = np.maximum(self.cost[arc_to], 1e-6)
+        if blocked is not None:
+            keep = ~(blocked[arc_from] | blocked[arc_to])
+            arc_from, arc_to, weight = arc_from[keep], arc_to[keep], weight[keep]
+        if reverse:
+            arc_from, arc_to = arc_to, arc_from
+        return csr_matrix((weight, (arc_from, arc_to)), shape=(index.edge_count, index.edge_count))
+
+    def blocked_mask(self, blocked_edges):
+        mask = np.zeros(self.index.edge_count, dtype=bool)
+        for edge_id in blocked_edges:
+            i = self.index.edge_index.get(edge_id)
+            if i is not None:
+                mask[i] = True
+        return mask
+
+    def _heuristic(self, target, source=None):
+        """
+        A* lower bound on the travel time from the end of edge e to the end of `target`.
+        """
+        start_junction = self.index.edge_from[target]
+        if start_junction < 0:
+            return lambda e: 0.0
+        gx = float(self.index.junction_x[start_junction])
+        gy = float(self.index.junction_y[start_junction])
+        end_x, end_y, scale = self._end_x, self._end_y, self._astar_scale
+
+        def heuristic(e):
+            if e == target or end_x[e] != end_x[e]:
+                return 0.0
+            return scale * math.hypot(end_x[e] - gx, end_y[e] - gy)
+        return heuristic
+
+    def route(self, from_edge, to_edge, blocked_edges=(), use_astar=True):
+        """
+        Fastest route from `from_edge` to `to_edge` that avoids `blocked_edges`, as a list of edge ids
+        starting with `from_edge`, or None if the destination can't be reached.
+        The start edge is allowed even if blocked (the vehicle is already on it).
+        """
+        edge_index = self.index.edge_index
+        if from_edge not in edge_index or to_edge not in edge_index:
+            return None
+        source, target = edge_index[from_edge], edge_index[to_edge]
+        blocked = blocked_edges if isinstance(blocked_edges, np.ndarray) else self.blocked_mask(blocked_edges)
+        if blocked[target] and target != source:
+            return None
+        blocked = blocked.tolist()
+
+        heuristic = self._heuristic(target, source) if use_astar else (lambda e: 0.0)
+
+        cost, succ_ptr, succ_idx = self._cost, self._succ_ptr, self._succ_idx
+        dist = {source: 0.0}
+        parent = {source: -1}
+        heap = [(heuristic(source), 0.0, source)]
+        settled = set()
+        while heap:
+            _, d, e = heapq.heappop(heap)
+            if e in settled:
+                continue
+            if e == target:
+                break
+            settled.add(e)
+            for k in range(succ_ptr[e], succ_ptr[e + 1]):
+                n = succ_idx[k]
+                if blocked[n] or n in settled:
+                    continue
+                nd = d + cost[n]
+                if nd < dist.get(n, math.inf):
+                    dist[n] = nd
+                    parent[n] = e
+                    heapq.heappush(heap, (nd + heuristic(n), nd, n))
+        if target not in parent:
+            return None
+
+        path = []
+        e = target
+        while e != -1:
+            path.append(self.index.edge_ids[e])
+            e = parent[e]
+        path.reverse()
+        return path
+
+
+class ShortestPathTreeCache:
+    """
+    Reverse shortest-path trees keyed by (destination edge, danger-set version).
+
+    A tree holds, for every edge, the next edge on its fastest blocked-edge-free path to the
+    destination, so every vehicle sharing that destination and danger set is routed by following
+    pointers in O(route length). Each distinct union of dangerous edges gets a version number;
+    trees for a version stay valid until that union changes, and the least recently used trees
+    are evicted beyond `max_trees`.
+    """
+
+    def __init__(self, router, max_trees=128):
+        self.router = router
+        self.max_trees = max_trees
+        self._trees = OrderedDict()
+        self._versions = {}
+        self._masks = {}
+        self.hits = 0
+        self.misses = 0
+
+    def danger_version(self, dangerous_edges):
+        key = frozenset(dangerous_edges)
+        if key not in self._versions:
+            self._versions[key] = len(self._versions)
+            self._masks[self._versions[key]] = self.router.blocked_mask(key)
+        return self._versions[key]
+
+    def tree(self, to_edge, version):
+        """
+        (next_edge, dist) arrays for `to_edge` under danger-set `version`, -9999 / inf where unreachable.
+        """
+        key = (to_edge, version)
+        if key in self._trees:
+            self.hits += 1
+            self._trees.move_to_end(key)
+            return self._trees[key]
+        self.misses += 1
+
+        reverse = self.router.arc_matrix(blocked=self._masks[version], reverse=True)
+        dist, next_edge = dijkstra(reverse, indices=self.router.index.edge_index[to_edge], return_predecessors=True)
+        self._trees[key] = (next_edge, dist)
+        if len(self._trees) > self.max_trees:
+            self._trees.popitem(last=False)
+        return self._trees[key]
+
+    def route(self, from_edge, to_edge, dangerous_edges=()):
+        edge_index, edge_ids = self.router.index.edge_index, self.router.index.edge_ids
+        if from_edge not in edge_index or to_edge not in edge_index:
+            return None
+        version = self.danger_version(dangerous_edges)
+        if self._masks[version][edge_index[to_edge]]:
+            return None
+        next_edge, dist = self.tree(to_edge, version)
+
+        e = edge_index[from_edge]
+        path = [from_edge]
+        if self._masks[version][e]:
+            # the vehicle is already on a blocked edge, so it has no tree pointer: take the best exit
+            successors = self.router.index.succ_idx[self.router.index.succ_ptr[e]:self.router.index.succ_ptr[e + 1]]
+            if successors.size == 0:
+                return None
+            e = int(successors[np.argmin(self.router.cost[successors] + dist[successors])])
+            if not np.isfinite(dist[e]):
+                return None
+            path.append(edge_ids[e])
+        elif not np.isfinite(dist[e]):
+            return None
+
+        target = edge_index[to_edge]
+        while e != target:
+            e = int(next_edge[e])
+            path.append(edge_ids[e])
+        return path
+
+
+class LandmarkRouter(EdgeRouter):
+    """
+    EdgeRouter with ALT lower bounds (A*, landmarks, triangle inequality).
+
+    Travel times from and to a few landmark edges are computed once on the unblocked graph and
+    stored next to the net file. Blocking edges only makes paths longer, so the bounds stay
+    admissible for any set of dangerous edges and queries need no extra preprocessing.
+    """
+
+    def __init__(self, index, landmark_count=16, cache_file=None, seed=0, active_landmarks=4):
+        super().__init__(index)
+        self.active_landmarks = active_landmarks
+        checksum = zlib.crc32("\n".join(index.edge_ids).encode() + self.cost.tobytes())
+        if cache_file and os.path.exists(cache_file):
+            with np.load(cache_file) as data:
+                if int(data["checksum"]) == checksum and len(data["landmarks"]) == landmark_count:
+                    self.landmarks = data["landmarks"]
+                    self.from_landmark = data["from_landmark"]
+                    self.to_landmark = data["to_landmark"]
+        if not hasattr(self, "landmarks"):
+            self._preprocess(landmark_count, seed)
+            if cache_file:
+                np.savez(cache_file, checksum=checksum, landmarks=self.landmarks,
+                         from_landmark=self.from_landmark, to_landmark=self.to_landmark)
+        self._from_rows = self.from_landmark.tolist()
+        self._to_rows = self.to_landmark.tolist()
+
+    def _preprocess(self, landmark_count, seed):
+        """
+        Farthest-landmark selection: each new landmark is the edge whose round-trip travel time
+        to the closest landmark chosen so far is largest.
+        """
+        forward = self.arc_matrix()
+        reverse = self.arc_matrix(reverse=True)
+        landmark_count = min(landmark_count, self.index.edge_count)
+        rng = np.random.default_rng(seed)
+
+        def round_trip(edge):
+            d_from = dijkstra(forward, indices=edge)
+            d_to = dijkstra(reverse, indices=edge)
+            return d_from, d_to, np.where(np.isfinite(d_from) & np.isfinite(d_to), d_from + d_to, 0.0)
+
+        _, _, spread = round_trip(int(rng.integers(self.index.edge_count)))
+        landmarks, from_landmark, to_landmark = [], [], []
+        closest = np.full(self.index.edge_count, np.inf)
+        candidate = int(np.argmax(spread))
+        for _ in range(landmark_count):
+            d_from, d_to, spread = round_trip(candidate)
+            landmarks.append(candidate)
+            from_landmark.append(d_from)
+            to_landmark.append(d_to)
+            closest = np.minimum(closest, spread)
+            closest[landmarks] = -1.0
+            candidate = int(np.argmax(closest))
+        self.landmarks = np.array(landmarks, dtype=np.int64)
+        self.from_landmark = np.array(from_landmark)
+        self.to_landmark = np.array(to_landmark)
+
+    def _heuristic(self, target, source=None):
+        """
+        ALT bound d(v, t) >= max(d(L, t) - d(L, v), d(v, L) - d(t, L)), evaluated lazily per settled
+        edge over the `active_landmarks` that give the tightest bound for this source/target pair.
+        """
+        finite = np.isfinite
+        if source is not None:
+            forward = self.from_landmark[:, target] - self.from_landmark[:, source]
+            backward = self.to_landmark[:, source] - self.to_landmark[:, target]
+            quality = np.fmax(np.where(finite(forward), forward, 0.0), np.where(finite(backward), backward, 0.0))
+            active = np.argsort(quality)[::-1][:self.active_landmarks]
+        else:
+            active = np.arange(len(self.landmarks))[:self.active_landmarks]
+        terms = []
+        for k in active:
+            to_target = float(self.from_landmark[k, target])
+            from_target = float(self.to_landmark[k, target])
+            if finite(to_target) or finite(from_target):
+                terms.append((self._from_rows[k], to_target, self._to_rows[k], from_target))
+
+        def heuristic(e):
+            if e == target:
+                return 0.0
+            best = 0.0
+            for from_row, to_target, to_row, from_target in terms:
+                # inf - inf (both unreachable from L) carries no information
+                bound = to_target - from_row[e]
+                if bound > best and bound == bound:
+                    best = bound
+                bound = to_row[e] - from_target
+                if bound > best and bound == bound:
+                    best = bound
+            return best
+        return heuristic
+
+_routers = {}
+
+
+def get_router(net_file="osm.net.xml"):
+    """
+    One EdgeRouter per net file, built on first use.
+    """
+    if net_file not in _routers:
+        _routers[net_file] = EdgeRouter(load_network_index(net_file))
+    return _routers[net_file]
+
+
+def get_landmark_router(net_file="osm.net.xml", landmark_count=16):
+    """
+    LandmarkRouter for a net file; the preprocessing is read from / written to `<net_file>.alt.npz`.
+    """
+    key = (net_file, landmark_count)
+    if key not in _routers:
+        _routers[key] = LandmarkRouter(load_network_index(net_file), landmark_count=landmark_count,
+                                       cache_file=f"{net_file}.alt.npz")
+    return _routers[key]
@@ -1,3 +1,4 @@
+import argparse
 import traci
 import random
 import os
@@ -5,11 +6,16 @@ import socialNetwork as sn
 
 from network_utils import get_edge_to_street_mapping, get_street_to_edges_mapping, count_vehicles_in_route_file
 from LLMmodelRunner import evaluate_rumor_with_llm, generate_prompts_based_on_cars
-from dynamicPathing import reroute_vehicle_with_multiple_rumors
-from csv_utils import update_street_statistics_csv
+from dynamicPathing import REROUTE_MODES, EdgePenaltyRerouter, RerouteScheduler, reroute_vehicle_with_multiple_rumors
+from edgeRouter import ShortestPathTreeCache, get_landmark_router, get_router
+from results_store import ResultsStore
+from occupancy_recorder import OccupancyRecorder
+from sumo_outputs import ingest_sumo_outputs, sumo_output_options
 
 
-def main():
+def main(reroute_mode="router", penalty_scope="vehicle", max_reroutes=None, reroute_budget=None,
+         results_db="results.sqlite", counting="traci", power_sync_every=0, power_outage="blink", rumor_count=2,
+         router_kind="tree"):
     network_file = "osm.net.xml"
     route_file = "osm.rou.xml"
     # For background polygons from OSM Web Wizard:
@@ -21,12 +27,43 @@ def main():
     edge_to_street, street_names, danger_levels = get_edge_to_street_mapping(network_file)
     street_to_edges = get_street_to_edges_mapping(osm_file=network_file)
     street_crossings = {edge: 0 for edge in edge_to_street.keys()}
+    if router_kind == "alt":
+        # one ALT query per rerouted vehicle; the landmark tables are cached next to the net file
+        router = get_landmark_router(network_file)
+        path_cache = None
+    else:
+        router = get_router(network_file)
+        path_cache = ShortestPathTreeCache(router)
+    penalty_rerouter = EdgePenaltyRerouter(network_file, scope=penalty_scope) if reroute_mode == "effort" else None
+    reroute_scheduler = None
+    if reroute_mode == "scheduled":
+        reroute_scheduler = RerouteScheduler(router, path_cache, max_reroutes=max_reroutes, time_budget=reroute_budget)
+
+    run_id = ResultsStore.new_run_id()
+    sumo_options = ["-a", poly_file]
+    if counting == "sumo-output":
+        # SUMO counts true edge entries itself and writes them out; nothing is polled per edge
+        sumo_options, edgedata_file, tripinfo_file = sumo_output_options(os.path.join("sumo_output", run_id),
+                                                                         additional_files=[poly_file])
+        occupancy = None
+        polled_edges = []
+    else:
+        # Per-tick counts of the polled edges, in the interned edge order of the router's NetworkIndex
+        occupancy = OccupancyRecorder(router.index, output_dir=os.path.join("occupancy", run_id))
+        polled_edges = [(edge, router.index.edge_index.get(edge, -1)) for edge in street_crossings]
 
     vehicle_to_node = {}
     prompted = generate_prompts_based_on_cars(car_total, street_names)
-    prompts = [random.choice(prompted) for _ in range(2)]
+    # rumor_count=0 records a baseline run without rumors
+    prompts = [random.choice(prompted) for _ in range(rumor_count)]
+    # Power network failures darken traffic lights; power flow is solved in a worker process.
+    # Imported only when used: it pulls in pypsa/matplotlib and sets PROJ_LIB for child processes.
+    power_coupler = None
+    if power_sync_every > 0:
+        from powerCoupling import PowerTrafficCoupler
+        power_coupler = PowerTrafficCoupler(network_file, sync_every=power_sync_every, outage_mode=power_outage)
 
-    traci.start(["sumo-gui", "-n", network_file, "-r", route_file, "-a", poly_file])
+    traci.start(["sumo-gui", "-n", network_file, "-r", route_file] + sumo_options)
 
     tick_counter = -1
     rumor_list = []
@@ -37,13 +74,20 @@ def main():
         while traci.simulation.getMinExpectedNumber() > 0:
             traci.simulationStep()
             tick_counter += 1
+            if power_coupler is not None:
+                power_coupler.step(tick_counter)
 
-            for edge in street_crossings.keys():
-                street_crossings[edge] += traci.edge.getLastStepVehicleNumber(edge)
-                for vehicle_id in traci.simulation.getDepartedIDList():
-                    if vehicle_id not in vehicle_to_node:
-                        assigned_node = len(vehicle_to_node) % car_total
-                        vehicle_to_node[vehicle_id] = assigned_node
+            if occupancy is not None:
+                occupancy_row = occupancy.next_row()
+                for edge, column in polled_edges:
+                    count = traci.edge.getLastStepVehicleNumber(edge)
+                    street_crossings[edge] += count
+                    if column >= 0:
+                        occupancy_row[column] = count
+            for vehicle_id in traci.simulation.getDepartedIDList():
+                if vehicle_id not in vehicle_to_node:
+                    assigned_node = len(vehicle_to_node) % car_total
+                    vehicle_to_node[vehicle_id] = assigned_node
 
             if tick_counter > 0 and tick_counter % 50 == 0 and prompts:
                 rumor = random.choice(prompts)
@@ -55,6 +99,8 @@ def main():
                 if negative_streetID in street_to_edges.get(street_name[0], []):
                     edges_to_add.append(negative_streetID)
                 dangerous_edges.extend(edges_to_add)
+                if occupancy is not None:
+                    occupancy.mark(f"rumor: {rumor} {edges_to_add}")
                 if sentiment == "negative":
                     social_network = sn.SocialNetwork(node_count=car_total, recovery_delay=10,
                                                       rumor_count=len(rumor_list) + 1, related_edges=edges_to_add)
@@ -68,10 +114,34 @@ def main():
                     social_network.run_time_step()
                     social_network.visualize()
 
-            for vehicle_id in traci.vehicle.getIDList():
-                reroute_vehicle_with_multiple_rumors(vehicle_id, social_models=social_networks,
-                                                     vehicle_to_node=vehicle_to_node)
+            if penalty_rerouter is not None:
+                penalty_rerouter.step(social_networks, vehicle_to_node)
+            elif reroute_scheduler is not None:
+                reroute_scheduler.step(social_networks, vehicle_to_node)
+            else:
+                for vehicle_id in traci.vehicle.getIDList():
+                    reroute_vehicle_with_multiple_rumors(vehicle_id, social_models=social_networks,
+                                                         vehicle_to_node=vehicle_to_node, router=router,
+                                                         path_cache=path_cache)
     finally:
+        # SUMO only finishes its output files once the connection is closed
+        traci.close()
+        metadata = {"reroute_mode": reroute_mode, "counting": counting, "rumor_count": rumor_count}
+        if power_coupler is not None:
+            power_coupler.close()
+            metadata["power_sync_every"] = power_sync_every
+            metadata["power_outage"] = power_outage
+        if occupancy is not None:
+            occupancy.close()
+            metadata["occupancy_dir"] = occupancy.output_dir
+        else:
+            with ResultsStore(results_db) as store:
+                entered = ingest_sumo_outputs(store, run_id, edgedata_file, tripinfo_file)
+            for edge in street_crossings:
+                street_crossings[edge] = entered.get(edge, 0)
+            metadata["edgedata_file"] = edgedata_file
+            metadata["tripinfo_file"] = tripinfo_file
+
         grouped_street_crossings = {}
         for edge, count in street_crossings.items():
             street_name = edge_to_street.get(edge, "Unknown Street")
@@ -82,16 +152,42 @@ def main():
             edges.sort(key=lambda x: x[0])
             for edge, count, street_name in edges:
                 print(f"{street_name} ({edge}): {count} crossings")
-        street_stats = {}
+        street_stats = []
         for base_edge, edges in grouped_street_crossings.items():
             for edge, count, street_name in edges:
-                street_stats[f"{street_name} ({edge})"] = count
-        rumor_street = str(dangerous_edges)
-        update_street_statistics_csv(street_stats, rumor_street)
-        print("Street statistics updated.")
-        traci.close()
+                street_stats.append((edge, street_name, count))
+        with ResultsStore(results_db) as store:
+            store.record_run(street_stats, rumor_edges=dangerous_edges, rumors=rumor_list, run_id=run_id,
+                             metadata=metadata)
+        print(f"Street statistics recorded as run {run_id} (export with `python csv_utils.py`).")
+        if path_cache is not None:
+            print(f"Route tree cache: {path_cache.hits} hits, {path_cache.misses} misses")
         print("Simulation ended.")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reroute-mode", choices=REROUTE_MODES, default="router",
+                        help="router: build safe routes in-process; effort: penalise dangerous edges and let SUMO reroute")
+    parser.add_argument("--penalty-scope", choices=("vehicle", "global"), default="vehicle",
+                        help="effort mode: penalise edges for infected vehicles only or for everyone")
+    parser.add_argument("--max-reroutes", type=int, default=None,
+                        help="scheduled mode: maximum vehicles rerouted per tick")
+    parser.add_argument("--reroute-budget-ms", type=float, default=None,
+                        help="scheduled mode: wall-time budget for rerouting per tick")
+    parser.add_argument("--router", choices=("tree", "alt"), default="tree",
+                        help="tree: shared shortest-path trees per destination; alt: A* with landmarks per vehicle")
+    parser.add_argument("--results-db", default="results.sqlite", help="SQLite results store to append this run to")
+    parser.add_argument("--counting", choices=("traci", "sumo-output"), default="traci",
+                        help="traci: poll every edge each tick; sumo-output: ingest SUMO edgeData/tripinfo at the end")
+    parser.add_argument("--rumors", type=int, default=2,
+                        help="rumors injected during the run; 0 records a baseline run")
+    parser.add_argument("--power-sync-every", type=int, default=0,
+                        help="couple the power network: advance failures and sync traffic lights every N ticks (0 = off)")
+    parser.add_argument("--power-outage", choices=("blink", "off"), default="blink",
+                        help="what an unpowered traffic light does: blink or switch off")
+    args = parser.parse_args()
+    main(reroute_mode=args.reroute_mode, penalty_scope=args.penalty_scope, max_reroutes=args.max_reroutes,
+         reroute_budget=None if args.reroute_budget_ms is None else args.reroute_budget_ms / 1000.0,
+         results_db=args.results_db, counting=args.counting, power_sync_every=args.power_sync_every,
+         power_outage=args.power_outage, rumor_count=args.rumors, router_kind=args.router)
@@ -0,0 +1,124 @@
+"""
+Headless rendering of the power network state, one frame per simulation step.
+
+Bus positions and the line/transformer segments are computed once per network (NetworkLayout).
+A frame is just a state code per bus; the background process that owns the figure only recolours
+the bus markers, retitles and saves, so the simulation loop never waits for matplotlib.
+"""
+import multiprocessing as mp
+import os
+
+import numpy as np
+from matplotlib.animation import FuncAnimation
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+
+SOURCE, DOWN, POWERED, DISCONNECTED = range(4)
+STATE_COLOURS = np.array(["yellow", "red", "green", "orange"])
+SOURCE_BUSES = ("MainPowerGrid", "LocalSubstation")
+
+
+class NetworkLayout:
+    """
+    Cached drawing geometry of a PyPSA network: bus coordinates and branch segments.
+    """
+
+    def __init__(self, network):
+        self.buses = list(network.buses.index)
+        self.xy = network.buses[["x", "y"]].to_numpy(dtype=float)
+        bus_index = network.buses.index
+        bus0 = bus_index.get_indexer(list(network.lines["bus0"]) + list(network.transformers["bus0"]))
+        bus1 = bus_index.get_indexer(list(network.lines["bus1"]) + list(network.transformers["bus1"]))
+        keep = (bus0 >= 0) & (bus1 >= 0)
+        self.segments = np.stack([self.xy[bus0[keep]], self.xy[bus1[keep]]], axis=1)
+        self.sources = np.isin(self.buses, SOURCE_BUSES)
+
+    def state_codes(self, down, powered):
+        """
+        Per-bus state code from boolean down/powered masks in bus order.
+        """
+        codes = np.full(len(self.buses), DISCONNECTED, dtype=np.uint8)
+        codes[powered] = POWERED
+        codes[down] = DOWN
+        codes[self.sources] = SOURCE
+        return codes
+
+
+def get_layout(network):
+    layout = getattr(network, "render_layout", None)
+    if layout is None or len(layout.buses) != len(network.buses):
+        layout = network.render_layout = NetworkLayout(network)
+    return layout
+
+
+def draw_layout(fig, layout, labels=True):
+    """
+    Draw the static part of the network on `fig`; returns the bus scatter and the title to update per frame.
+    """
+    ax = fig.add_subplot()
+    ax.add_collection(LineCollection(layout.segments, colors="gray", linewidths=1, zorder=1))
+    scatter = ax.scatter(layout.xy[:, 0], layout.xy[:, 1], s=300 if labels else 20,
+                         c=STATE_COLOURS[np.full(len(layout.buses), DISCONNECTED)], zorder=2)
+    if labels:
+        for bus, (x, y) in zip(layout.buses, layout.xy):
+            ax.text(x, y, bus, fontsize=8, ha="center", va="center", zorder=3)
+    ax.set_axis_off()
+    ax.autoscale_view()
+    return scatter, ax.set_title("")
+
+
+def _render_frames(layout, queue, output_dir, animation_file, fps, labels):
+    fig = Figure(figsize=(10, 8))
+    FigureCanvasAgg(fig)
+    scatter, title = draw_layout(fig, layout, labels)
+
+    def update(frame):
+        time_step, codes = frame
+        scatter.set_facecolor(STATE_COLOURS[codes])
+        title.set_text(f"Power Network at T={time_step}")
+        return scatter, title
+
+    frames = []
+    while (frame := queue.get()) is not None:
+        update(frame)
+        if output_dir:
+            fig.savefig(os.path.join(output_dir, f"frame_{frame[0]:05d}.png"))
+        if animation_file:
+            frames.append(frame)
+    if animation_file and frames:
+        FuncAnimation(fig, update, frames=frames, blit=False).save(animation_file, fps=fps)
+
+
+class NetworkRenderer:
+    """
+    Writes a PNG per rendered step to `output_dir` and, if `animation_file` is set (e.g. .gif or
+    .mp4), an animation of all steps on close(). Rendering happens in a separate process; render()
+    only queues the state codes and blocks just when more than `max_pending` frames are waiting.
+    """
+
+    def __init__(self, network, output_dir="frames", animation_file=None, fps=2, labels=None, max_pending=64):
+        layout = get_layout(network)
+        if labels is None:
+            labels = len(layout.buses) <= 200
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        context = mp.get_context("spawn")
+        self.queue = context.Queue(max_pending)
+        self.process = context.Process(target=_render_frames, daemon=True,
+                                       args=(layout, self.queue, output_dir, animation_file, fps, labels))
+        self.process.start()
+
+    def render(self, time_step, codes):
+        self.queue.put((time_step, np.asarray(codes, dtype=np.uint8)))
+
+    def close(self):
+        if self.process.is_alive():
+            self.queue.put(None)
+            self.process.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,5 +1,8 @@
+import functools
 import xml.etree.ElementTree as ET
 
+import numpy as np
+
 def get_street_names_from_network(network_file):
     tree = ET.parse(network_file)
     root = tree.getroot()
@@ -38,3 +41,88 @@ def count_vehicles_in_route_file(route_file):
     root = tree.getroot()
     vehicle_count = len(root.findall("vehicle"))
     return vehicle_count
+
+
+class NetworkIndex:
+    """
+    Array view of a SUMO .net.xml, parsed once and shared by the routing and recording code.
+
+    Normal edges (function="internal" excluded) and junctions are interned: edge_index and
+    junction_index map SUMO ids to positions in the parallel arrays below. Successors come from
+    the <connection> elements and are stored as CSR (succ_ptr, succ_idx), so the edges reachable
+    from edge i are succ_idx[succ_ptr[i]:succ_ptr[i + 1]].
+    """
+
+    def __init__(self, net_file):
+        tree = ET.parse(net_file)
+        root = tree.getroot()
+        self.net_file = net_file
+
+        self.junction_ids = []
+        self.junction_types = []
+        junction_x, junction_y = [], []
+        for junction in root.findall("junction"):
+            if junction.get("type") == "internal":
+                continue
+            self.junction_ids.append(junction.get("id"))
+            self.junction_types.append(junction.get("type"))
+            junction_x.append(float(junction.get("x")))
+            junction_y.append(float(junction.get("y")))
+        self.junction_index = {j: i for i, j in enumerate(self.junction_ids)}
+        self.junction_x = np.array(junction_x, dtype=np.float64)
+        self.junction_y = np.array(junction_y, dtype=np.float64)
+
+        self.edge_ids = []
+        self.edge_names = []
+        from_junction, to_junction, lengths, speeds = [], [], [], []
+        for edge in root.findall("edge"):
+            if edge.get("function") == "internal":
+                continue
+            lanes = edge.findall("lane")
+            self.edge_ids.append(edge.get("id"))
+            self.edge_names.append(edge.get("name", ""))
+            from_junction.append(self.junction_index.get(edge.get("from"), -1))
+            to_junction.append(self.junction_index.get(edge.get("to"), -1))
+            lengths.append(float(lanes[0].get("length")) if lanes else 0.0)
+            speeds.append(max((float(lane.get("speed")) for lane in lanes), default=13.89))
+        self.edge_index = {e: i for i, e in enumerate(self.edge_ids)}
+        self.edge_from = np.array(from_junction, dtype=np.int64)
+        self.edge_to = np.array(to_junction, dtype=np.int64)
+        self.edge_length = np.array(lengths, dtype=np.float64)
+        self.edge_speed = np.array(speeds, dtype=np.float64)
+
+        pairs = set()
+        for connection in root.findall("connection"):
+            src = self.edge_index.get(connection.get("from"))
+            dst = self.edge_index.get(connection.get("to"))
+            if src is not None and dst is not None:
+                pairs.add((src, dst))
+        pairs = np.array(sorted(pairs), dtype=np.int64).reshape(-1, 2)
+        self.succ_idx = pairs[:, 1].copy()
+        self.succ_ptr = np.zeros(len(self.edge_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(pairs[:, 0], minlength=len(self.edge_ids)), out=self.succ_ptr[1:])
+
+    @property
+    def edge_count(self):
+        return len(self.edge_ids)
+
+    def edge_travel_time(self):
+        """
+        Free-flow travel time of every edge in seconds.
+        """
+        return self.edge_length / np.maximum(self.edge_speed, 0.1)
+
+    def predecessors(self):
+        """
+        Reverse CSR (pred_ptr, pred_idx): the edges leading into edge i are pred_idx[pred_ptr[i]:pred_ptr[i + 1]].
+        """
+        sources = np.repeat(np.arange(self.edge_count), np.diff(self.succ_ptr))
+        order = np.argsort(self.succ_idx, kind="stable")
+        pred_ptr = np.zeros(self.edge_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.succ_idx, minlength=self.edge_count), out=pred_ptr[1:])
+        return pred_ptr, sources[order]
+
+
+@functools.lru_cache(maxsize=None)
+def load_network_index(net_file="osm.net.xml"):
+    return NetworkIndex(net_file)
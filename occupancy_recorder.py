@@ -0,0 +1,144 @@
+import json
+import os
+
+import numpy as np
+
+
+class OccupancyRecorder:
+    """
+    Per-tick vehicle counts for every edge, stored as an edge x tick time series.
+
+    Columns follow the interned edge order of a NetworkIndex. Rows go into preallocated,
+    memory-mapped .npy chunks of `chunk_ticks` ticks each, so recording a tick is a row write
+    into the page cache and a long run never has to fit in memory.
+    """
+
+    def __init__(self, index, output_dir="occupancy", chunk_ticks=3600, dtype=np.uint16):
+        self.edge_ids = list(index.edge_ids)
+        self.edge_index = index.edge_index
+        self.output_dir = output_dir
+        self.chunk_ticks = chunk_ticks
+        self.dtype = np.dtype(dtype)
+        self.ticks = 0
+        self.events = []
+        self._chunk = None
+        self._chunk_files = []
+        os.makedirs(output_dir, exist_ok=True)
+
+    def next_row(self):
+        """
+        Zeroed row for the next tick; write counts into it by edge column.
+        """
+        row = self.ticks % self.chunk_ticks
+        if row == 0:
+            if self._chunk is not None:
+                self._chunk.flush()
+            path = os.path.join(self.output_dir, f"chunk_{len(self._chunk_files):05d}.npy")
+            self._chunk = np.lib.format.open_memmap(path, mode="w+", dtype=self.dtype,
+                                                    shape=(self.chunk_ticks, len(self.edge_ids)))
+            self._chunk_files.append(os.path.basename(path))
+        self.ticks += 1
+        return self._chunk[row]
+
+    def record(self, counts):
+        self.next_row()[:] = counts
+
+    def mark(self, label, tick=None):
+        """
+        Remember an event such as a rumor injection at `tick` (default: the last recorded tick).
+        """
+        self.events.append({"tick": self.ticks - 1 if tick is None else tick, "label": label})
+
+    def close(self):
+        if self._chunk is not None:
+            self._chunk.flush()
+            self._chunk = None
+        with open(os.path.join(self.output_dir, "meta.json"), "w") as f:
+            json.dump({
+                "ticks": self.ticks,
+                "chunk_ticks": self.chunk_ticks,
+                "dtype": self.dtype.str,
+                "chunks": self._chunk_files,
+                "edge_ids": self.edge_ids,
+                "events": self.events
+            }, f)
+
+
+def load_occupancy(output_dir):
+    """
+    Returns (chunks, edge_ids, events) for a closed recorder directory. chunks is the list of
+    read-only memory-mapped tick x edge chunks in tick order, trimmed to the recorded ticks, so
+    nothing is read into memory until it is used. Aggregate chunk by chunk (e.g. street_rollup on
+    each chunk) or pull a tick range with occupancy_ticks.
+    """
+    with open(os.path.join(output_dir, "meta.json")) as f:
+        meta = json.load(f)
+    chunks = []
+    remaining = meta["ticks"]
+    for name in meta["chunks"]:
+        chunk = np.load(os.path.join(output_dir, name), mmap_mode="r")
+        chunks.append(chunk[:remaining])
+        remaining -= len(chunks[-1])
+    return chunks, meta["edge_ids"], meta["events"]
+
+
+def occupancy_ticks(chunks, start, stop):
+    """
+    Ticks [start, stop) across the chunk list as one array; only the chunks overlapping the range are read.
+    """
+    parts = []
+    offset = 0
+    for chunk in chunks:
+        lo, hi = max(start - offset, 0), min(stop - offset, len(chunk))
+        if lo < hi:
+            parts.append(chunk[lo:hi])
+        offset += len(chunk)
+    if not parts:
+        return np.zeros((0, chunks[0].shape[1] if chunks else 0), dtype=chunks[0].dtype if chunks else np.uint16)
+    return np.concatenate(parts)
+
+
+def street_codes(edge_ids, edge_to_street):
+    """
+    Integer street code per edge column (-1 for unnamed edges) and the street name of each code.
+    """
+    names = np.array([edge_to_street.get(edge, "") for edge in edge_ids], dtype=object)
+    streets, codes = np.unique(names.astype(str), return_inverse=True)
+    if len(streets) and streets[0] == "":
+        streets, codes = streets[1:], codes - 1
+    return codes, list(streets)
+
+
+def street_rollup(occupancy, codes, street_count):
+    """
+    tick x street totals: every edge column is added to its street's column with one np.bincount.
+    """
+    occupancy = np.asarray(occupancy)
+    keep = codes >= 0
+    ticks = occupancy.shape[0]
+    bins = (np.arange(ticks)[:, None] * street_count + codes[keep][None, :]).ravel()
+    totals = np.bincount(bins, weights=occupancy[:, keep].ravel(), minlength=ticks * street_count)
+    return totals.reshape(ticks, street_count)
+
+
+def window_means(occupancy, tick, before, after):
+    """
+    Mean occupancy per column over the `before` ticks preceding `tick` and the `after` ticks from `tick` on.
+    """
+    occupancy = np.asarray(occupancy, dtype=np.float64)
+    pre = occupancy[max(0, tick - before):tick]
+    post = occupancy[tick:tick + after]
+    empty = np.full(occupancy.shape[1], np.nan)
+    return (pre.mean(axis=0) if len(pre) else empty), (post.mean(axis=0) if len(post) else empty)
+
+
+def rolling_mean(occupancy, window):
+    """
+    Trailing mean over `window` ticks along the tick axis (shorter windows at the start).
+    """
+    occupancy = np.asarray(occupancy, dtype=np.float64)
+    cumulative = np.cumsum(occupancy, axis=0)
+    result = cumulative.copy()
+    result[window:] = cumulative[window:] - cumulative[:-window]
+    counts = np.minimum(np.arange(1, occupancy.shape[0] + 1), window)[:, None]
+    return result / counts
@@ -0,0 +1,166 @@
+"""
+Live coupling of the traffic-light power network to a running SUMO simulation.
+
+    python main.py --power-sync-every 10 --power-outage blink
+
+Traffic and power run at different step rates. Every `sync_every` traffic steps the failure
+process advances one power step, the newest finished power-flow result is applied to SUMO, and
+the current failure state is handed to a worker process for the next solve. simulationStep never
+waits for the solver: a result reaches SUMO at the first sync point after it is ready. Traffic
+lights of buses below `v_min` (dead islands and down buses are at 0 p.u.) are switched off or to
+blinking, and go back to their own program when power returns.
+"""
+import multiprocessing as mp
+import queue
+import random
+import xml.etree.ElementTree as ET
+
+import traci
+
+from powerNetwork import PowerFlowCache, advance_failures
+from powerNetworkGen import (
+    create_power_network,
+    get_connectivity,
+    get_road_edges_from_sumo,
+    get_traffic_lights_from_sumo,
+    set_nodes_down,
+    set_nodes_up,
+)
+
+OUTAGE_MODES = ("blink", "off")
+
+
+def get_junction_tls(network_file):
+    """
+    {junction id: [traffic light ids]} from the tl attribute of the connections entering each junction.
+    Junctions without a signalled connection are left out.
+    """
+    root = ET.parse(network_file).getroot()
+    edge_to = {edge.get("id"): edge.get("to") for edge in root.findall("edge") if edge.get("function") != "internal"}
+    junction_tls = {}
+    for connection in root.findall("connection"):
+        tls = connection.get("tl")
+        junction = edge_to.get(connection.get("from"))
+        if tls and junction:
+            signals = junction_tls.setdefault(junction, [])
+            if tls not in signals:
+                signals.append(tls)
+    return junction_tls
+
+
+def _power_flow_worker(network, v_min, requests, results):
+    """
+    Solve each (power_step, down_nodes) request and answer with the traffic-light buses that are
+    unpowered. If power flow fails, the buses cut off from the grid count as unpowered.
+    """
+    pf_cache = PowerFlowCache()
+    lights = network.loads["bus"].unique()
+    down_nodes = set()
+    while (request := requests.get()) is not None:
+        power_step, requested = request
+        requested = set(requested)
+        set_nodes_up(network, down_nodes - requested)
+        set_nodes_down(network, requested - down_nodes)
+        down_nodes = requested
+        if pf_cache.solve(network, down_nodes):
+            v = network.buses_t.v_mag_pu.iloc[-1].reindex(lights, fill_value=0.0)
+            unpowered = list(v.index[(v < v_min).to_numpy()])
+        else:
+            powered = set(get_connectivity(network).powered_nodes())
+            unpowered = [bus for bus in lights if bus not in powered]
+        results.put((power_step, unpowered))
+    pf_cache.report()
+
+
+class PowerTrafficCoupler:
+    """
+    Drives the power network's random failures alongside a TraCI simulation. Call step(tick) after
+    every traci.simulationStep() and close() when the simulation ends.
+    """
+
+    def __init__(self, network_file, sync_every=10, outage_mode="blink", v_min=0.9, feeders=3, seed=None):
+        if outage_mode not in OUTAGE_MODES:
+            raise ValueError(f"outage_mode must be one of {OUTAGE_MODES}, got {outage_mode!r}")
+        self.network, self.sumo_to_label, self.label_to_sumo = create_power_network(
+            get_traffic_lights_from_sumo(network_file), get_road_edges_from_sumo(network_file), feeders=feeders
+        )
+        junction_tls = get_junction_tls(network_file)
+        self.label_to_tls = {label: junction_tls.get(junction, []) for label, junction in self.label_to_sumo.items()}
+        self.sync_every = max(1, sync_every)
+        self.outage_mode = outage_mode
+        self.rng = random.Random(seed)
+        self.down_nodes = set()
+        self.power_step = 0
+        self.signals = None
+        self.dark = {}
+        self.link_counts = {}
+        self.pending = False
+        self.applied = 0
+        self.skipped = 0
+
+        context = mp.get_context("spawn")
+        self.requests = context.Queue()
+        self.results = context.Queue()
+        self.worker = context.Process(target=_power_flow_worker, daemon=True,
+                                      args=(self.network.copy(), v_min, self.requests, self.results))
+        self.worker.start()
+
+    def step(self, tick):
+        """
+        Sync point every `sync_every` ticks: apply the newest finished result, advance the failures
+        and, unless the worker is still solving, send it the new state.
+        """
+        if tick % self.sync_every:
+            return
+        latest = None
+        while True:
+            try:
+                latest = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending = False
+        if latest is not None:
+            self.apply(*latest)
+        if self.pending and not self.worker.is_alive():
+            raise RuntimeError(f"Power flow worker exited with code {self.worker.exitcode} at power step "
+                               f"{self.power_step}; traffic lights would no longer follow the power network.")
+
+        self.power_step += 1
+        advance_failures(self.network, self.down_nodes, self.rng)
+        if self.pending:
+            self.skipped += 1
+        else:
+            self.requests.put((self.power_step, sorted(self.down_nodes)))
+            self.pending = True
+
+    def apply(self, power_step, unpowered):
+        """
+        Switch the traffic lights of the unpowered buses off (or to blinking) and restore the rest.
+        Only lights whose state changed since the last result get a TraCI call.
+        """
+        if self.signals is None:
+            self.signals = set(traci.trafficlight.getIDList())
+        dark = {tls for label in unpowered for tls in self.label_to_tls.get(label, ()) if tls in self.signals}
+        went_dark = dark.difference(self.dark)
+        restored = set(self.dark).difference(dark)
+        for tls in went_dark:
+            self.dark[tls] = traci.trafficlight.getProgram(tls)
+            if self.outage_mode == "off":
+                traci.trafficlight.setProgram(tls, "off")
+            else:
+                if tls not in self.link_counts:
+                    self.link_counts[tls] = len(traci.trafficlight.getRedYellowGreenState(tls))
+                traci.trafficlight.setRedYellowGreenState(tls, "o" * self.link_counts[tls])
+        for tls in restored:
+            traci.trafficlight.setProgram(tls, self.dark.pop(tls))
+        self.applied += 1
+        if went_dark or restored:
+            print(f"Power step {power_step}: {len(went_dark)} traffic lights lost power, {len(restored)} restored, "
+                  f"{len(self.dark)} dark")
+
+    def close(self):
+        if self.worker.is_alive():
+            self.requests.put(None)
+            self.worker.join(timeout=30)
+        print(f"Power coupling: {self.power_step} power steps, {self.applied} results applied, "
+              f"{self.skipped} not sent while the solver was busy, {len(self.dark)} traffic lights dark at the end")
@@ -1,171 +1,274 @@
+import argparse
 import os
 import random
 import time
-import copy
-import csv
-import pypsa
+import hashlib
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
 import matplotlib.pyplot as plt
-import networkx as nx
 
 from powerNetworkGen import (
     get_traffic_lights_from_sumo,
     get_road_edges_from_sumo,
     create_power_network,
-    build_networkx_graph,
-    get_powered_nodes,
+    get_connectivity,
+    PowerConnectivity,
     set_node_down,
-    set_node_up
+    set_node_up,
+    set_nodes_down,
+    set_nodes_up
 )
+from networkRenderer import STATE_COLOURS, NetworkRenderer, draw_layout, get_layout
+from voltage_recorder import VoltageRecorder
 
 os.environ["PROJ_LIB"] = r"C:\\Users\\kth258\\AppData\\Local\\anaconda3\\envs\\sot\\Library\\share\\proj"
 
 ############################
 # POWER FLOW
 ############################
-def run_power_flow(network):
+# Time-series results written by lpf/pf, per component
+PF_RESULTS = {
+    "buses_t": ("p", "q", "v_mag_pu", "v_ang"),
+    "lines_t": ("p0", "q0", "p1", "q1"),
+    "transformers_t": ("p0", "q0", "p1", "q1"),
+    "generators_t": ("p", "q"),
+    "loads_t": ("p", "q"),
+}
+
+def run_power_flow(network, down_nodes=()):
     """
     Attempts a power flow with Q-limits disabled, then a normal .pf() call
     without initial_solution (for older PyPSA versions).
+
+    Island-aware: with the buses in 'down_nodes' taken out, only the island connected to
+    MainPowerGrid is handed to the solver. Buses that are down or in a dead island (no slack)
+    are set to 0 p.u. and their branches to 0 flow without solving.
     """
     if network.generators.empty:
         print("⚠️ No generator. Skipping power flow.")
-        return
+        return False
+
+    connectivity = get_connectivity(network)
+    connectivity.sync(down_nodes)
+    islands = connectivity.islands()
+    slack_bus = connectivity.buses.get_loc("MainPowerGrid") if "MainPowerGrid" in connectivity.buses else None
+    live_islands = [island for island in islands if slack_bus in island]
+    dead_islands = [island for island in islands if slack_bus not in island]
+
+    if not live_islands:
+        print("⚠️ MainPowerGrid is down. Setting every bus to 0 p.u.")
+        _write_dead_results(network, network, set())
+        return True
 
+    energised = connectivity.buses[live_islands[0]]
+    whole_network = len(energised) == len(network.buses)
+    solved = network if whole_network else _island_network(network, energised)
+
+    start = time.perf_counter()
     try:
         # 1) Turn off Q-limits to avoid reactive constraints
-        network.enforce_Q_limits = False
+        solved.enforce_Q_limits = False
 
         # 2) Attempt a linear load flow warm-start
-        network.lpf()
+        solved.lpf()
 
         # 3) Nonlinear PF but remove 'initial_solution' argument for older versions
-        network.pf()
-        # If partial islands or lines are too small, you might still see warnings.
+        solved.pf()
 
     except Exception as e:
         print(f"⚠️ PF failed: {e}")
+        return False
+    print(f"Solved island of {len(energised)} buses in {time.perf_counter() - start:.3f}s")
+
+    if not whole_network:
+        _write_dead_results(network, solved, set(energised))
+        down = int(connectivity.down.sum())
+        print(f"Skipped {len(dead_islands)} dead islands ({sum(len(i) for i in dead_islands)} buses) "
+              f"and {down} down buses: set to 0 p.u.")
+    return True
+
+def _island_network(network, energised):
+    """
+    Copy of the network holding only the energised buses and the components attached to them.
+    """
+    dead = network.buses.index.difference(energised)
+    island = network.copy()
+    for component, columns in (("Line", ("bus0", "bus1")), ("Transformer", ("bus0", "bus1")),
+                               ("Load", ("bus",)), ("Generator", ("bus",))):
+        static = island.static(component)
+        attached = np.zeros(len(static), dtype=bool)
+        for column in columns:
+            attached |= static[column].isin(dead).to_numpy()
+        island.remove(component, static.index[attached])
+    island.remove("Bus", dead)
+    return island
+
+def _write_dead_results(network, solved, energised):
+    """
+    Copy the island's results into the full network, with 0 for everything outside 'energised'.
+    """
+    for component, attrs in PF_RESULTS.items():
+        static = getattr(network, component[:-len("_t")])
+        for attr in attrs:
+            frame = getattr(solved, component)[attr]
+            if not energised:
+                frame = frame.iloc[:, :0]
+            getattr(network, component)[attr] = frame.reindex(index=network.snapshots, columns=static.index,
+                                                             fill_value=0.0)
+
+# Static columns that change the solution when they change
+PF_STATE_COLUMNS = {
+    "loads": ("bus", "p_set", "q_set", "active"),
+    "generators": ("bus", "control", "p_nom", "p_set", "q_set", "active"),
+    "lines": ("bus0", "bus1", "r", "x", "g", "b", "length", "active"),
+    "transformers": ("bus0", "bus1", "r", "x", "s_nom", "tap_ratio", "phase_shift", "active"),
+    "buses": ("v_nom", "v_mag_pu_set"),
+}
+
+class PowerFlowCache:
+    """
+    Solved power-flow results keyed by a fingerprint of the network state (topology, set-points
+    and snapshots). If the state is unchanged since the last solve, nothing is done; if it was
+    seen before, the stored results are copied back into the network instead of solving again.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.results = OrderedDict()
+        self.last_key = None
+        self.unchanged = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def state_key(network, down_nodes=()):
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(repr(sorted(down_nodes)).encode())
+        for component, columns in PF_STATE_COLUMNS.items():
+            static = getattr(network, component)
+            frame = static[[c for c in columns if c in static.columns]]
+            digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+        for attr in ("p_set", "q_set"):
+            varying = network.loads_t[attr]
+            if not varying.empty:
+                digest.update(pd.util.hash_pandas_object(varying, index=True).to_numpy().tobytes())
+        digest.update(repr(list(network.snapshots)).encode())
+        return digest.digest()
+
+    def solve(self, network, down_nodes=()):
+        """
+        Make the network hold power-flow results for its current state and down buses.
+        Returns False if PF failed.
+        """
+        key = self.state_key(network, down_nodes)
+        if key == self.last_key:
+            self.unchanged += 1
+            return True
+
+        cached = self.results.get(key)
+        if cached is not None:
+            self.results.move_to_end(key)
+            for (component, attr), frame in cached.items():
+                getattr(network, component)[attr] = frame.copy()
+            self.hits += 1
+            self.last_key = key
+            return True
+
+        self.misses += 1
+        if not run_power_flow(network, down_nodes):
+            self.last_key = None
+            return False
+        self.results[key] = {
+            (component, attr): getattr(network, component)[attr].copy()
+            for component, attrs in PF_RESULTS.items() for attr in attrs
+        }
+        if len(self.results) > self.max_entries:
+            self.results.popitem(last=False)
+        self.last_key = key
+        return True
+
+    def report(self):
+        total = self.unchanged + self.hits + self.misses
+        rate = 100.0 * (self.unchanged + self.hits) / total if total else 0.0
+        print(f"Power flow cache: {total} requests, {self.unchanged} unchanged, {self.hits} hits, "
+              f"{self.misses} solves ({rate:.1f}% hit rate)")
 
 ############################
 # VISUALIZATION
 ############################
-def visualize_network_state(network, down_nodes, time_step=0):
+def network_state_codes(network, down_nodes):
+    """
+    Per-bus state codes (see networkRenderer) in network.buses order.
+    """
+    connectivity = get_connectivity(network)
+    connectivity.sync(down_nodes)
+    return get_layout(network).state_codes(connectivity.down, connectivity.powered_mask())
+
+def visualize_network_state(network, down_nodes, time_step=0, renderer=None):
     """
     Plot the network with color-coded states:
       Red    = node is 'down'
       Green  = node is up + BFS powered
       Orange = node is up but disconnected
       Yellow = substation / main grid
+
+    With a NetworkRenderer the frame is queued for its background process and this returns at
+    once; without one the plot opens in a blocking window.
     """
-    powered = get_powered_nodes(network, down_nodes)
-
-    G = nx.Graph()
-    pos = {}
-    node_colors = []
-
-    for bus in network.buses.index:
-        if bus in ["MainPowerGrid", "LocalSubstation"]:
-            # Place them near each other for clarity
-            pos[bus] = (network.buses.x.get(bus, -50.0), network.buses.y.get(bus, -50.0))
-            node_colors.append("yellow")
-            G.add_node(bus)
-            continue
-
-        G.add_node(bus)
-        xval = network.buses.x.get(bus, 0.0)
-        yval = network.buses.y.get(bus, 0.0)
-        pos[bus] = (xval, yval)
-
-        if bus in down_nodes:
-            node_colors.append("red")
-        else:
-            if bus in powered:
-                node_colors.append("green")
-            else:
-                node_colors.append("orange")
-
-    # Add lines
-    for line_name in network.lines.index:
-        b0 = network.lines.at[line_name, "bus0"]
-        b1 = network.lines.at[line_name, "bus1"]
-        G.add_edge(b0, b1)
-
-    # Add transformers
-    for trafo_name in network.transformers.index:
-        b0 = network.transformers.at[trafo_name, "bus0"]
-        b1 = network.transformers.at[trafo_name, "bus1"]
-        G.add_edge(b0, b1)
-
-    plt.figure(figsize=(10, 8))
-    nx.draw(G, pos, with_labels=True, node_color=node_colors, edge_color="gray", font_size=8)
-    plt.title(f"Power Network at T={time_step}")
+    codes = network_state_codes(network, down_nodes)
+    if renderer is not None:
+        renderer.render(time_step, codes)
+        return
+
+    fig = plt.figure(figsize=(10, 8))
+    scatter, title = draw_layout(fig, get_layout(network))
+    scatter.set_facecolor(STATE_COLOURS[codes])
+    title.set_text(f"Power Network at T={time_step}")
     plt.show()
 
 ############################
-# CSV LOGGING
+# VOLTAGE LOGGING
 ############################
-def initialize_csv_log(network, csv_file="node_stats.csv"):
+def initialize_voltage_log(network, output_dir="voltages"):
     """
-    Prepare an in-memory dict for storing v_mag/time data, plus create the CSV header.
-    Each row = node, columns = time steps T=1, T=2, ...
+    Prepare a VoltageRecorder for storing v_mag/time data per bus.
+    The node_stats CSV (row = node, columns = T=1, T=2, ...) is exported from it at the end.
     """
-    voltages = {bus: [] for bus in network.buses.index}
-    with open(csv_file, "w", newline="") as f:
-        writer = csv.writer(f)
-        header = ["Node"]
-        writer.writerow(header)
-        # Each subsequent row: [BusName]
-        for bus in network.buses.index:
-            writer.writerow([bus])
-    return voltages
-
-def append_csv_column(network, voltages, t, csv_file="node_stats.csv"):
+    return VoltageRecorder(network.buses.index, output_dir)
+
+def record_voltages(network, recorder, t):
     """
-    After PF, store bus voltages in voltages dict, append to CSV as a new column T=t.
+    After PF, store bus voltages for time step t in the recorder.
     """
-    # If snapshots empty, define them
-    if len(network.snapshots) == 0:
-        network.set_snapshots(["now"])
-
-    # Ensure we have PF results
-    run_power_flow(network)
-
     # Check if there's bus voltage data
     if network.buses_t.v_mag_pu.empty:
-        print("No bus voltage data. Skipping CSV column.")
+        print("No bus voltage data. Skipping voltage column.")
         return
 
     last_v = network.buses_t.v_mag_pu.iloc[-1]
-    for bus in network.buses.index:
-        voltages[bus].append(last_v.get(bus, 0.0))
-
-    # read current CSV -> append a new column
-    with open(csv_file, "r", newline="") as f:
-        rows = list(csv.reader(f))
-
-    # first row is ["Node", T=1, T=2, ...]
-    rows[0].append(f"T={t}")
-    # subsequent rows each correspond to a bus
-    bus_index_map = {}
-    for i in range(1, len(rows)):
-        bus_name = rows[i][0]
-        bus_index_map[bus_name] = i
-
-    for bus in network.buses.index:
-        vval = last_v.get(bus, 0.0)
-        row_idx = bus_index_map[bus]
-        rows[row_idx].append(f"{vval:.3f}")
-
-    with open(csv_file, "w", newline="") as f:
-        writer = csv.writer(f)
-        for row in rows:
-            writer.writerow(row)
+    recorder.record(t, last_v.reindex(recorder.buses, fill_value=0.0).to_numpy())
 
 ############################
 # LARGE-SCALE / PARTITION FAILURES
 ############################
-def simulate_local_partition_failure(network, down_nodes, center_bus=None, depth=2):
+def partition_failure_regions(network, down_nodes, centre_buses, depth=2):
+    """
+    {centre: buses within 'depth' hops} for many centre buses at once, walking only buses that
+    aren't down. Centres that are down or missing are left out.
+    """
+    connectivity = get_connectivity(network)
+    connectivity.sync(down_nodes)
+    centre_buses = list(centre_buses)
+    positions = connectivity.buses.get_indexer(centre_buses)
+    valid = np.flatnonzero(positions >= 0)
+    valid = valid[~connectivity.down[positions[valid]]]
+    regions = connectivity.k_hop(positions[valid], depth)
+    return {centre_buses[i]: list(connectivity.buses[row]) for i, row in zip(valid, regions)}
+
+def simulate_local_partition_failure(network, down_nodes, center_bus=None, depth=2, rng=random):
     """
-    Find a BFS subgraph of given 'depth' from 'center_bus' and mark them as down.
+    Find the buses within 'depth' hops of 'center_bus' and mark them as down.
     If center_bus not given, pick a random bus that isn't down or the substation.
     """
     # Potential centers exclude substation + main grid + already down
@@ -178,102 +281,204 @@ def simulate_local_partition_failure(network, down_nodes, center_bus=None, depth
         return
 
     if center_bus is None:
-        center_bus = random.choice(candidates)
-
-    # Build a graph ignoring currently down nodes
-    G = nx.Graph()
-    for bus in network.buses.index:
-        if bus not in down_nodes:
-            G.add_node(bus)
-    # Add edges
-    for line_name in network.lines.index:
-        b0 = network.lines.at[line_name, "bus0"]
-        b1 = network.lines.at[line_name, "bus1"]
-        if b0 not in down_nodes and b1 not in down_nodes:
-            G.add_edge(b0, b1)
-    # Also add transformers
-    for trafo_name in network.transformers.index:
-        b0 = network.transformers.at[trafo_name, "bus0"]
-        b1 = network.transformers.at[trafo_name, "bus1"]
-        if b0 not in down_nodes and b1 not in down_nodes:
-            G.add_edge(b0, b1)
-
-    if center_bus not in G:
+        center_bus = rng.choice(candidates)
+
+    regions = partition_failure_regions(network, down_nodes, [center_bus], depth)
+    if center_bus not in regions:
         print(f"Center bus {center_bus} is not in the BFS graph. Possibly down or missing.")
         return
 
-    # BFS for 'depth' levels
-    # We'll track the level of each node from center_bus
-    levels = {n: None for n in G.nodes}
-    levels[center_bus] = 0
-    queue = [center_bus]
-
-    while queue:
-        current = queue.pop(0)
-        for neighbor in G.neighbors(current):
-            if levels[neighbor] is None:
-                levels[neighbor] = levels[current] + 1
-                if levels[neighbor] < depth:
-                    queue.append(neighbor)
-
-    # Mark all BFS nodes within 'depth' as down
-    fail_group = []
-    for b in G.nodes:
-        if levels[b] is not None and levels[b] <= depth:
-            fail_group.append(b)
+    # Mark all nodes within 'depth' as down
+    fail_group = regions[center_bus]
 
     print(f"\n💥 Local partition fail from center {center_bus}, depth={depth}, failing: {fail_group}")
-    for fn in fail_group:
-        down_nodes.add(fn)
-        set_node_down(network, fn)
+    down_nodes.update(fail_group)
+    set_nodes_down(network, fail_group)
+
+############################
+# BATCHED FAILURE SCENARIOS
+############################
+def solve_failure_scenarios(network, failure_sets, line_outages=None):
+    """
+    Solve many failure states the way run_power_flow solves one: in scenario i the buses in
+    failure_sets[i] are taken out, only the island fed by MainPowerGrid is solved, and down buses and
+    dead islands are 0 p.u. Scenarios are grouped by their set of out-of-service lines
+    (line_outages[i]) and then by their set of energised buses. With the down buses out every load
+    left is at its nominal p_set, so a group has a single solution: each group's island goes through
+    one lpf + pf call and its result is shared by all of the group's scenarios.
+
+    Returns (buses, v_mag_pu, v_ang, converged): bus x scenario arrays and a per-scenario flag.
+    The network itself is not modified.
+    """
+    failure_sets = [list(failed) for failed in failure_sets]
+    count = len(failure_sets)
+    if line_outages is None:
+        line_outages = [()] * count
+    buses = network.buses.index
+
+    outage_groups = {}
+    for i, outages in enumerate(line_outages):
+        outage_groups.setdefault(frozenset(outages), []).append(i)
+
+    v_mag_pu = np.zeros((len(buses), count))
+    v_ang = np.zeros((len(buses), count))
+    converged = np.ones(count, dtype=bool)
+    for outages, scenarios in outage_groups.items():
+        topology = network.copy()
+        if outages:
+            topology.remove("Line", [line for line in outages if line in topology.lines.index])
+        set_nodes_up(topology, topology.buses.index)
+        connectivity = PowerConnectivity(topology)
+        slack_bus = connectivity.buses.get_loc("MainPowerGrid") if "MainPowerGrid" in connectivity.buses else None
+
+        # energised bus positions (as bytes) -> (positions, scenarios); no live island: all 0 p.u.
+        groups = {}
+        for i in scenarios:
+            connectivity.sync(failure_sets[i])
+            energised = next((island for island in connectivity.islands() if slack_bus in island), None)
+            if energised is not None:
+                groups.setdefault(energised.tobytes(), (energised, []))[1].append(i)
+
+        for energised, members in groups.values():
+            whole_network = len(energised) == len(topology.buses)
+            island = topology if whole_network else _island_network(topology, connectivity.buses[energised])
+            start = time.perf_counter()
+            try:
+                island.enforce_Q_limits = False
+                island.lpf()
+                info = island.pf()
+            except Exception as e:
+                print(f"⚠️ PF failed for {len(members)} scenarios with {len(energised)} energised buses "
+                      f"and lines {sorted(outages)} out: {e}")
+                v_mag_pu[:, members] = np.nan
+                v_ang[:, members] = np.nan
+                converged[members] = False
+                continue
+            print(f"Solved {len(members)} scenarios on an island of {len(energised)} buses with "
+                  f"{len(outages)} lines out in {time.perf_counter() - start:.2f}s")
+            rows = buses.get_indexer(island.buses.index)
+            v_mag_pu[np.ix_(rows, members)] = island.buses_t.v_mag_pu.iloc[-1].to_numpy()[:, None]
+            v_ang[np.ix_(rows, members)] = island.buses_t.v_ang.iloc[-1].to_numpy()[:, None]
+            converged[members] = bool(info["converged"].to_numpy().all())
+    return list(buses), v_mag_pu, v_ang, converged
+
+def advance_failures(network, down_nodes, rng=random):
+    """
+    One step of run_simulation's failure process without solving: a random bus failure, a local
+    partition failure and a recovery, each with its own probability. Updates down_nodes and the loads.
+    """
+    # random single node failure
+    if rng.random() < 0.1:
+        candidates = [
+            b for b in network.buses.index
+            if b not in ["MainPowerGrid", "LocalSubstation"] and b not in down_nodes
+        ]
+        if candidates:
+            fail_node = rng.choice(candidates)
+            print(f"Failing node {fail_node}!")
+            down_nodes.add(fail_node)
+            set_node_down(network, fail_node)
+
+    # BFS-based local partition failure
+    if rng.random() < 0.4:
+        simulate_local_partition_failure(network, down_nodes, depth=2, rng=rng)
+
+    # random node recovery
+    if rng.random() < 0.1 and down_nodes:
+        recov = rng.choice(sorted(down_nodes))
+        print(f"Recovering node {recov}!")
+        down_nodes.remove(recov)
+        set_node_up(network, recov)
+
+def sample_failure_trajectory(network, total_steps=10, seed=None):
+    """
+    Draw the random failures, partition failures and recoveries of run_simulation without solving,
+    and return the set of down buses after each step. Works on a copy of the network.
+    """
+    rng = random.Random(seed)
+    scratch = network.copy()
+    down_nodes = set()
+    trajectory = []
+    for t in range(1, total_steps + 1):
+        advance_failures(scratch, down_nodes, rng)
+        trajectory.append(set(down_nodes))
+    return trajectory
+
+def run_scenario_simulation(total_steps=10, seed=None, network_file="osm.net.xml"):
+    """
+    Scenario mode of run_simulation: sample the whole failure trajectory first, then solve it with
+    solve_failure_scenarios (one power flow per distinct energised island, not per step) and export
+    node_stats.csv from the bus x step voltages. Gives the same voltages as run_simulation with that seed.
+    """
+    traffic_light_nodes = get_traffic_lights_from_sumo(network_file)
+    road_edges = get_road_edges_from_sumo(network_file)
+    network, sumo_to_label, label_to_sumo = create_power_network(traffic_light_nodes, road_edges, feeders=3)
+
+    trajectory = sample_failure_trajectory(network, total_steps, seed)
+    buses, v_mag_pu, v_ang, converged = solve_failure_scenarios(network, trajectory)
+    print(f"{int(converged.sum())}/{len(converged)} steps converged.")
+
+    recorder = initialize_voltage_log(network, "voltages")
+    for t in range(1, total_steps + 1):
+        recorder.record(t, np.nan_to_num(v_mag_pu[:, t - 1]))
+    recorder.export_csv("node_stats.csv")
+    print("\nScenario simulation ended. Check node_stats.csv for logs.")
 
 ############################
 # MAIN SIMULATION
 ############################
-def run_simulation():
+def run_simulation(total_steps=10, seed=None, show=False, step_delay=0.0, frames_dir="frames",
+                   animation_file=None):
+    """
+    Random failure simulation over total_steps steps; seed makes the failures reproducible and
+    gives the same trajectory as run_scenario_simulation with that seed.
+    Every step is rendered headless to frames_dir (and animation_file); show=True also opens each
+    step in a blocking window, step_delay sleeps between steps.
+    """
     network_file = "osm.net.xml"
     traffic_light_nodes = get_traffic_lights_from_sumo(network_file)
     road_edges = get_road_edges_from_sumo(network_file)
 
     network, sumo_to_label, label_to_sumo = create_power_network(traffic_light_nodes, road_edges, feeders=3)
 
-    total_steps = 10
+    rng = random.Random(seed)
     down_nodes = set()
-    voltages = initialize_csv_log(network, "node_stats.csv")
+    recorder = initialize_voltage_log(network, "voltages")
+    pf_cache = PowerFlowCache()
+    renderer = NetworkRenderer(network, frames_dir, animation_file) if frames_dir or animation_file else None
 
     for t in range(1, total_steps + 1):
         print(f"\n=== Time Step {t} ===")
-
-        # random single node failure
-        if random.random() < 0.1:
-            candidates = [
-                b for b in network.buses.index
-                if b not in ["MainPowerGrid", "LocalSubstation"] and b not in down_nodes
-            ]
-            if candidates:
-                fail_node = random.choice(candidates)
-                print(f"Failing node {fail_node}!")
-                down_nodes.add(fail_node)
-                set_node_down(network, fail_node)
-
-        # BFS-based local partition failure
-        if random.random() < 0.4:
-            simulate_local_partition_failure(network, down_nodes, depth=2)
-
-        # random node recovery
-        if random.random() < 0.1 and down_nodes:
-            recov = random.choice(list(down_nodes))
-            print(f"Recovering node {recov}!")
-            down_nodes.remove(recov)
-            set_node_up(network, recov)
-
-        run_power_flow(network)
-        append_csv_column(network, voltages, t, "node_stats.csv")
-        visualize_network_state(network, down_nodes, time_step=t)
-        time.sleep(1)
-
+        advance_failures(network, down_nodes, rng)
+        pf_cache.solve(network, down_nodes)
+        record_voltages(network, recorder, t)
+        if renderer is not None:
+            visualize_network_state(network, down_nodes, time_step=t, renderer=renderer)
+        if show:
+            visualize_network_state(network, down_nodes, time_step=t)
+        if step_delay:
+            time.sleep(step_delay)
+
+    if renderer is not None:
+        renderer.close()
+    recorder.export_csv("node_stats.csv")
+    pf_cache.report()
     print("\nSimulation ended. Check node_stats.csv for logs.")
 
 
 if __name__ == "__main__":
-    run_simulation()
+    parser = argparse.ArgumentParser(description="Traffic-light power network failure simulation")
+    parser.add_argument("--scenario", action="store_true",
+                        help="sample the whole failure trajectory and solve each distinct energised island once")
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--show", action="store_true", help="open every step in a blocking plot window")
+    parser.add_argument("--step-delay", type=float, default=0.0, help="seconds to sleep between steps")
+    parser.add_argument("--frames-dir", default="frames", help="headless PNG frames ('' to disable)")
+    parser.add_argument("--animation", help="also write an animation of all steps, e.g. network.gif")
+    args = parser.parse_args()
+    if args.scenario:
+        run_scenario_simulation(args.steps, args.seed)
+    else:
+        run_simulation(args.steps, args.seed, show=args.show, step_delay=args.step_delay,
+                       frames_dir=args.frames_dir, animation_file=args.animation)
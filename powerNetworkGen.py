@@ -1,11 +1,20 @@
 import xml.etree.ElementTree as ET
 import os
-import math
+import numpy as np
+import pandas as pd
 import pypsa
 import networkx as nx
+from scipy.sparse import csr_matrix, diags
+from scipy.sparse.csgraph import breadth_first_order, connected_components
 
 os.environ["PROJ_LIB"] = r"C:\Users\kth258\AppData\Local\anaconda3\envs\sot\Library\share\proj"
 
+# Junction types that get a traffic-light bus
+TRAFFIC_LIGHT_JUNCTION_TYPES = ("traffic_light", "priority", "unregulated")
+# Shortest line built (km): co-located junctions would otherwise give a zero-impedance line,
+# which makes the susceptance matrix of the DC power flow singular
+MIN_LINE_LENGTH_KM = 0.001
+
 
 def get_traffic_lights_from_sumo(network_file):
     """
@@ -17,7 +26,7 @@ def get_traffic_lights_from_sumo(network_file):
 
     for junction in root.findall("junction"):
         jtype = junction.get("type")
-        if jtype in ["traffic_light", "priority", "unregulated"]:
+        if jtype in TRAFFIC_LIGHT_JUNCTION_TYPES:
             node_id = junction.get("id")
             x, y = float(junction.get("x")), float(junction.get("y"))
             traffic_lights[node_id] = (x, y)
@@ -40,6 +49,33 @@ def get_road_edges_from_sumo(network_file):
 
 
 def create_power_network(traffic_light_nodes, road_edges, feeders=2):
+    """
+    Creates the PyPSA network for {sumo_id: (x, y)} traffic lights and (from, to) road edges.
+    See _build_power_network.
+    """
+    sumo_ids = list(traffic_light_nodes)
+    coords = np.array(list(traffic_light_nodes.values()), dtype=float).reshape(-1, 2)
+    junctions = pd.Index(sumo_ids)
+    road = np.array(list(road_edges), dtype=object).reshape(-1, 2)
+    return _build_power_network(sumo_ids, coords[:, 0], coords[:, 1],
+                                junctions.get_indexer(road[:, 0]), junctions.get_indexer(road[:, 1]), feeders)
+
+
+def create_power_network_from_index(index, feeders=2):
+    """
+    Same network as create_power_network, built straight from the arrays of a (cached) NetworkIndex.
+    """
+    positions = np.flatnonzero(np.isin(index.junction_types, TRAFFIC_LIGHT_JUNCTION_TYPES))
+    remap = np.full(len(index.junction_ids), -1, dtype=np.int64)
+    remap[positions] = np.arange(len(positions))
+    from_pos = np.where(index.edge_from >= 0, remap[index.edge_from], -1)
+    to_pos = np.where(index.edge_to >= 0, remap[index.edge_to], -1)
+    sumo_ids = [index.junction_ids[i] for i in positions]
+    return _build_power_network(sumo_ids, index.junction_x[positions], index.junction_y[positions],
+                                from_pos, to_pos, feeders)
+
+
+def _build_power_network(sumo_ids, xs, ys, from_pos, to_pos, feeders=2):
     """
     Creates a PyPSA network with:
       - MainPowerGrid (230 kV, slack generator)
@@ -49,17 +85,30 @@ def create_power_network(traffic_light_nodes, road_edges, feeders=2):
       - Each traffic light bus has a 0.02 MW load
 
     Updated with more realistic line impedances & reduced generator capacity.
+
+    Traffic light i (sumo_ids[i] at xs[i], ys[i]) becomes bus N{i+1}; road edge j runs from
+    position from_pos[j] to to_pos[j] (-1 = not a traffic light, skipped). Buses, loads and lines
+    are added in bulk, one network.add call each.
     """
     network = pypsa.Network()
 
-    # Slack bus: main power grid
-    network.add("Bus", name="MainPowerGrid", v_nom=230)
+    # Assign short labels to traffic lights
+    labels = np.char.add("N", np.arange(1, len(sumo_ids) + 1).astype(str))
+    sumo_to_label = dict(zip(sumo_ids, labels.tolist()))
+    label_to_sumo = dict(zip(labels.tolist(), sumo_ids))
+    xs, ys = np.asarray(xs, dtype=float), np.asarray(ys, dtype=float)
+
+    # Slack bus: main power grid (230 kV), local substation (20 kV), then one 20 kV bus per traffic light
+    network.add(
+        "Bus",
+        np.concatenate([["MainPowerGrid", "LocalSubstation"], labels]),
+        v_nom=np.concatenate([[230.0, 20.0], np.full(len(labels), 20.0)]),
+        x=np.concatenate([[0.0, 0.0], xs]),
+        y=np.concatenate([[0.0, 0.0], ys])
+    )
     # LOWER the nominal capacity to ~50 MW if total load is small
     network.add("Generator", name="MainGenerator", bus="MainPowerGrid", p_nom=50, control="Slack")
 
-    # Local substation at 20 kV
-    network.add("Bus", name="LocalSubstation", v_nom=20)
-
     # Transformer 230 -> 20 kV
     network.add(
         "Transformer",
@@ -70,62 +119,78 @@ def create_power_network(traffic_light_nodes, road_edges, feeders=2):
         v_nom0=230,
         v_nom1=20,
         x_sc=10,  # ~10%
-        r_sc=1  # ~1%
+        r_sc=1,  # ~1%
+        x=0.1,  # PyPSA reads the per-unit x/r, not x_sc/r_sc
+        r=0.01
     )
 
-    # Assign short labels to traffic lights
-    sumo_to_label = {}
-    label_to_sumo = {}
-    for i, (sumo_id, (x, y)) in enumerate(traffic_light_nodes.items(), start=1):
-        label = f"N{i}"
-        sumo_to_label[sumo_id] = label
-        label_to_sumo[label] = sumo_id
-
-        network.add("Bus", name=label, v_nom=20, x=x, y=y)
-        # Each traffic light ~0.02 MW
-        network.add("Load", name=f"load_{label}", bus=label, p_set=0.02)
-
-    # Connect local substation to multiple feeders (some random or first 'feeders' nodes)
-    all_labels = list(sumo_to_label.values())
-    feeder_labels = all_labels[:feeders]
-    # Example line data from substation to feeders
-    for feed_l in feeder_labels:
-        network.add(
-            "Line",
-            name=f"Feeder_{feed_l}",
-            bus0="LocalSubstation",
-            bus1=feed_l,
-            length=0.1,
-            r_per_length=0.0003,  # More realistic R
-            x_per_length=0.0004
-        )
+    # Each traffic light ~0.02 MW
+    network.add("Load", np.char.add("load_", labels), bus=labels, p_set=0.02)
+
+    # Connect local substation to multiple feeders (the first 'feeders' nodes), 0.1 km each
+    feeder_labels = labels[:feeders]
 
     # Connect traffic lights with lines based on road edges
     # Use a bit higher impedances for distribution lines
     r_per_m = 0.0003
     x_per_m = 0.0004
-    for (s_from, s_to) in road_edges:
-        if s_from in sumo_to_label and s_to in sumo_to_label:
-            from_label = sumo_to_label[s_from]
-            to_label = sumo_to_label[s_to]
-            (x1, y1) = traffic_light_nodes[s_from]
-            (x2, y2) = traffic_light_nodes[s_to]
-            dist_m = math.hypot(x2 - x1, y2 - y1)
-            dist_km = dist_m / 1000.0
-
-            network.add(
-                "Line",
-                name=f"{from_label}-{to_label}",
-                bus0=from_label,
-                bus1=to_label,
-                length=dist_km,
-                r_per_length=r_per_m,
-                x_per_length=x_per_m
-            )
+    from_pos = np.asarray(from_pos, dtype=np.int64)
+    to_pos = np.asarray(to_pos, dtype=np.int64)
+    keep = (from_pos >= 0) & (to_pos >= 0)
+    from_pos, to_pos = from_pos[keep], to_pos[keep]
+    dist_km = np.hypot(xs[to_pos] - xs[from_pos], ys[to_pos] - ys[from_pos]) / 1000.0
+    road_names = np.char.add(np.char.add(labels[from_pos], "-"), labels[to_pos])
+    # Parallel road edges map to the same line; keep the first
+    first = ~pd.Index(road_names).duplicated()
+
+    length = np.maximum(np.concatenate([np.full(len(feeder_labels), 0.1), dist_km[first]]), MIN_LINE_LENGTH_KM)
+    names = np.concatenate([np.char.add("Feeder_", feeder_labels), road_names[first]])
+    if len(names):
+        network.add(
+            "Line",
+            names,
+            bus0=np.concatenate([np.full(len(feeder_labels), "LocalSubstation"), labels[from_pos][first]]),
+            bus1=np.concatenate([feeder_labels, labels[to_pos][first]]),
+            length=length,
+            r_per_length=r_per_m,  # More realistic R
+            x_per_length=x_per_m,
+            r=r_per_m * length,  # PyPSA reads r/x in ohms, not the per-length values
+            x=x_per_m * length
+        )
 
+    network.load_index = LoadIndex(network)
+    network.connectivity = PowerConnectivity(network)
     return network, sumo_to_label, label_to_sumo
 
 
+class LoadIndex:
+    """
+    Bus -> loads lookup built once per network, with each load's nominal p_set, so toggling the
+    loads of many buses is a single vectorised assignment instead of a scan over every load.
+    """
+
+    def __init__(self, network):
+        self.load_names = network.loads.index
+        self.nominal = network.loads["p_set"].copy()
+        self.bus_positions = {bus: positions for bus, positions in network.loads.groupby("bus").indices.items()}
+
+    def loads_of(self, buses):
+        positions = [self.bus_positions[bus] for bus in buses if bus in self.bus_positions]
+        if not positions:
+            return self.load_names[:0]
+        return self.load_names[np.concatenate(positions)]
+
+
+def get_load_index(network):
+    """
+    The network's LoadIndex; networks not made by create_power_network get one on first use.
+    """
+    index = getattr(network, "load_index", None)
+    if index is None:
+        index = network.load_index = LoadIndex(network)
+    return index
+
+
 def build_networkx_graph(network, down_nodes):
     """
     Build a NetworkX graph from PyPSA lines + transformers,
@@ -154,33 +219,174 @@ def build_networkx_graph(network, down_nodes):
     return G
 
 
+class PowerConnectivity:
+    """
+    Bus adjacency of the lines and transformers as a CSR matrix, built once, plus a mask of down
+    buses. The energised set is found with SciPy connected_components and only recomputed when a
+    change can affect it: failing a bus that is already unpowered changes nothing, and recovering
+    a bus only energises its own component if it touches a powered neighbour.
+    """
+
+    SOURCES = ("MainPowerGrid", "LocalSubstation")
+
+    def __init__(self, network):
+        self.buses = network.buses.index
+        branches = [network.lines[["bus0", "bus1"]], network.transformers[["bus0", "bus1"]]]
+        bus0 = np.concatenate([self.buses.get_indexer(b["bus0"]) for b in branches])
+        bus1 = np.concatenate([self.buses.get_indexer(b["bus1"]) for b in branches])
+        keep = (bus0 >= 0) & (bus1 >= 0)
+        bus0, bus1 = bus0[keep], bus1[keep]
+        n = len(self.buses)
+        self.adjacency = csr_matrix(
+            (np.ones(2 * len(bus0), dtype=np.int8), (np.concatenate([bus0, bus1]), np.concatenate([bus1, bus0]))),
+            shape=(n, n)
+        )
+        self.adjacency.data[:] = 1
+        self.branch_count = len(network.lines) + len(network.transformers)
+        self.sources = self.buses.get_indexer([b for b in self.SOURCES if b in self.buses])
+        self.down = np.zeros(n, dtype=bool)
+        self._powered = None
+        self.recomputes = 0
+
+    def matches(self, network):
+        return (len(network.buses) == len(self.buses)
+                and len(network.lines) + len(network.transformers) == self.branch_count)
+
+    def positions(self, buses):
+        positions = self.buses.get_indexer(list(buses))
+        return positions[positions >= 0]
+
+    def neighbours(self, position):
+        return self.adjacency.indices[self.adjacency.indptr[position]:self.adjacency.indptr[position + 1]]
+
+    def _live_adjacency(self):
+        live = np.flatnonzero(~self.down)
+        return live, self.adjacency[live][:, live]
+
+    def set_down(self, buses):
+        positions = self.positions(buses)
+        positions = positions[~self.down[positions]]
+        if not len(positions):
+            return
+        self.down[positions] = True
+        if self._powered is not None and self._powered[positions].any():
+            self._powered = None
+
+    def set_up(self, buses):
+        positions = self.positions(buses)
+        positions = positions[self.down[positions]]
+        if not len(positions):
+            return
+        self.down[positions] = False
+        if self._powered is None:
+            return
+        for position in positions:
+            if self._powered[position]:
+                continue
+            if np.isin(position, self.sources) or self._powered[self.neighbours(position)].any():
+                live, live_adjacency = self._live_adjacency()
+                start = np.searchsorted(live, position)
+                reached = breadth_first_order(live_adjacency, start, directed=False, return_predecessors=False)
+                self._powered[live[reached]] = True
+
+    def sync(self, down_nodes):
+        """
+        Bring the down mask in line with a set of down bus names.
+        """
+        wanted = np.zeros(len(self.buses), dtype=bool)
+        wanted[self.positions(down_nodes)] = True
+        changed = wanted != self.down
+        if changed.any():
+            self.set_down(self.buses[changed & wanted])
+            self.set_up(self.buses[changed & ~wanted])
+
+    def powered_mask(self):
+        if self._powered is None:
+            live, live_adjacency = self._live_adjacency()
+            _, labels = connected_components(live_adjacency, directed=False)
+            source_positions = np.searchsorted(live, self.sources[~self.down[self.sources]])
+            powered = np.zeros(len(self.buses), dtype=bool)
+            powered[live] = np.isin(labels, labels[source_positions])
+            self._powered = powered
+            self.recomputes += 1
+        return self._powered
+
+    def powered_nodes(self):
+        return set(self.buses[self.powered_mask()])
+
+    def k_hop(self, centres, depth):
+        """
+        centres x buses mask of the buses within `depth` hops of each centre (bus positions),
+        walking only buses that are not down. Frontiers of the whole batch expand together,
+        one sparse product per hop.
+        """
+        centres = np.asarray(centres, dtype=np.int64)
+        live = (~self.down).astype(np.float32)
+        step = (diags(live) @ self.adjacency @ diags(live)).tocsr()
+        reached = np.zeros((len(centres), len(self.buses)), dtype=bool)
+        reached[np.arange(len(centres)), centres] = ~self.down[centres]
+        frontier = reached
+        for _ in range(depth):
+            if not frontier.any():
+                break
+            # The adjacency is symmetric, so (frontier @ step) == (step @ frontier.T).T
+            frontier = (step @ frontier.T.astype(np.float32)).T > 0
+            frontier &= ~reached
+            reached |= frontier
+        return reached
+
+    def islands(self):
+        """
+        Bus positions of every island left once the down buses are taken out, largest first.
+        """
+        live, live_adjacency = self._live_adjacency()
+        count, labels = connected_components(live_adjacency, directed=False)
+        order = np.argsort(labels, kind="stable")
+        islands = np.split(live[order], np.cumsum(np.bincount(labels, minlength=count))[:-1])
+        return sorted(islands, key=len, reverse=True)
+
+
+def get_connectivity(network):
+    """
+    The network's PowerConnectivity, rebuilt if buses or branches were added since it was made.
+    """
+    connectivity = getattr(network, "connectivity", None)
+    if connectivity is None or not connectivity.matches(network):
+        connectivity = network.connectivity = PowerConnectivity(network)
+    return connectivity
+
+
 def get_powered_nodes(network, down_nodes):
     """
-    BFS from 'MainPowerGrid' and 'LocalSubstation' to find which nodes are energized.
-    If a node is in 'down_nodes', it's forced out of BFS.
+    Buses connected to 'MainPowerGrid' or 'LocalSubstation' through buses that are not down.
     """
-    G = build_networkx_graph(network, down_nodes)
-    powered = set()
-    for source in ["MainPowerGrid", "LocalSubstation"]:
-        if source in G:
-            for node in nx.bfs_tree(G, source):
-                powered.add(node)
-    return powered
+    connectivity = get_connectivity(network)
+    connectivity.sync(down_nodes)
+    return connectivity.powered_nodes()
 
 
-def set_node_down(network, node):
+def set_nodes_down(network, nodes):
     """
-    Mark a node as 'down' by zeroing out its load. Keep the bus in the network for visualization.
+    Mark nodes as 'down' by zeroing out their loads. Keep the buses in the network for visualization.
     """
-    for load_name in network.loads.index:
-        if network.loads.at[load_name, "bus"] == node:
-            network.loads.at[load_name, "p_set"] = 0.0
+    loads = get_load_index(network).loads_of(nodes)
+    if len(loads):
+        network.loads.loc[loads, "p_set"] = 0.0
 
 
-def set_node_up(network, node):
+def set_nodes_up(network, nodes):
     """
-    Reactivate a node's load (set to 0.02).
+    Reactivate the nodes' loads at their nominal p_set.
     """
-    for load_name in network.loads.index:
-        if network.loads.at[load_name, "bus"] == node:
-            network.loads.at[load_name, "p_set"] = 0.02
+    index = get_load_index(network)
+    loads = index.loads_of(nodes)
+    if len(loads):
+        network.loads.loc[loads, "p_set"] = index.nominal.loc[loads].to_numpy()
+
+
+def set_node_down(network, node):
+    set_nodes_down(network, [node])
+
+
+def set_node_up(network, node):
+    set_nodes_up(network, [node])
@@ -0,0 +1,84 @@
+import numpy as np
+
+# Node states, same encoding as SocialNetwork.status
+SUSCEPTIBLE = 0
+INFECTED = 1
+RECOVERED = 2
+
+
+class PropagationEngine:
+    """
+    Vectorised counterpart of SocialNetwork.run_time_step for many rumors at once.
+
+    Every rumor is one row of `status` spreading over the same complete graph of `node_count`
+    nodes. On a complete graph a susceptible node escapes all I infected neighbours with
+    probability (1 - p)^I, so one uniform draw per node reproduces the per-edge coin flips.
+    """
+
+    def __init__(self, node_count, recovery_delay=10, infection_prob=0.05, seed=None):
+        self.node_count = node_count
+        self.recovery_delay = recovery_delay
+        self.infection_prob = infection_prob
+        self.rng = np.random.default_rng(seed)
+        self.status = np.zeros((0, node_count), dtype=np.uint8)
+        # -1 means "never infected" (None in SocialNetwork.infection_time)
+        self.infection_time = np.zeros((0, node_count), dtype=np.int32)
+        self.current_step = np.zeros(0, dtype=np.int32)
+        self.rows = {}
+
+    def add_rumor(self, key, seed_infection=True):
+        """
+        Register a rumor and return its row. Like SocialNetwork, one random node starts infected.
+        """
+        if key in self.rows:
+            return self.rows[key]
+        row = len(self.rows)
+        status = np.zeros((1, self.node_count), dtype=np.uint8)
+        infection_time = np.full((1, self.node_count), -1, dtype=np.int32)
+        if seed_infection and self.node_count:
+            initial_infected = self.rng.integers(self.node_count)
+            status[0, initial_infected] = INFECTED
+            infection_time[0, initial_infected] = 0
+        self.status = np.vstack([self.status, status])
+        self.infection_time = np.vstack([self.infection_time, infection_time])
+        self.current_step = np.append(self.current_step, np.int32(0))
+        self.rows[key] = row
+        return row
+
+    def step(self, rows=None):
+        """
+        Advance the given rows (all rows if None) by one time step.
+        """
+        if rows is None:
+            rows = np.arange(len(self.rows))
+        rows = np.asarray(rows, dtype=np.intp)
+        if rows.size == 0:
+            return
+        status = self.status[rows]
+        infection_time = self.infection_time[rows]
+        current_step = self.current_step[rows][:, None]
+
+        infected = status == INFECTED
+        escape_prob = (1.0 - self.infection_prob) ** infected.sum(axis=1, keepdims=True)
+        newly_infected = (status == SUSCEPTIBLE) & (self.rng.random(status.shape) >= escape_prob)
+        recovered = infected & (current_step - infection_time >= self.recovery_delay)
+
+        infection_time = np.where(newly_infected & (infection_time < 0), current_step, infection_time)
+        status[newly_infected] = INFECTED
+        status[recovered] = RECOVERED
+
+        self.status[rows] = status
+        self.infection_time[rows] = infection_time
+        self.current_step[rows] += 1
+
+    def statuses(self, key):
+        return self.status[self.rows[key]].copy()
+
+    def statuses_dict(self, key):
+        """
+        Same shape as SocialNetwork.status: {node: state}.
+        """
+        return dict(enumerate(self.status[self.rows[key]].tolist()))
+
+    def is_complete(self, key):
+        return not (self.status[self.rows[key]] == INFECTED).any()
@@ -28,10 +28,12 @@ import subprocess
 from collections import defaultdict
 import math
 
+import numpy as np
+
 if 'SUMO_HOME' in os.environ:
     sys.path.append(os.path.join(os.environ['SUMO_HOME'], 'tools'))
 import sumolib  # noqa
-from sumolib.miscutils import euclidean, parseTime, intIfPossible  # noqa
+from sumolib.miscutils import parseTime, intIfPossible  # noqa
 from sumolib.geomhelper import naviDegree, minAngleDegreeDiff  # noqa
 from sumolib.net.lane import is_vehicle_class  # noqa
 
@@ -338,30 +340,47 @@ def loadStops(options):
 # distribution with these weights
 
 
+def numpy_rng():
+    """numpy generator seeded from the random module, so --seed also fixes batched draws"""
+    return np.random.default_rng(random.getrandbits(64))
+
+
 class RandomEdgeGenerator:
 
     def __init__(self, net, weight_fun):
         self.net = net
         self.weight_fun = weight_fun
-        self.cumulative_weights = []
-        self.total_weight = 0
-        for edge in self.net._edges:
-            # print edge.getID(), weight_fun(edge)
-            self.total_weight += weight_fun(edge)
-            self.cumulative_weights.append(self.total_weight)
+        # weight_fun is evaluated once per edge; the array is reused by write_weights
+        self.weights = np.fromiter((weight_fun(edge) for edge in self.net._edges),
+                                   dtype=np.float64, count=len(self.net._edges))
+        self.cumulative_weights = np.cumsum(self.weights)
+        self.total_weight = float(self.cumulative_weights[-1]) if len(self.weights) else 0.
+        # scalar bisect on a list is faster than np.searchsorted for single draws
+        self._cumulative_list = self.cumulative_weights.tolist()
         if self.total_weight == 0:
             raise InvalidGenerator()
 
     def get(self):
         r = random.random() * self.total_weight
-        index = bisect.bisect(self.cumulative_weights, r)
+        index = bisect.bisect(self._cumulative_list, r)
         return self.net._edges[index]
 
+    def get_indices(self, n, rng=None):
+        """draw n edge indices (into net._edges) at once with the same distribution as get()"""
+        if rng is None:
+            rng = numpy_rng()
+        r = rng.random(n) * self.total_weight
+        return np.searchsorted(self.cumulative_weights, r, side="right")
+
+    def get_many(self, n, rng=None):
+        edges = self.net._edges
+        return [edges[i] for i in self.get_indices(n, rng)]
+
     def write_weights(self, fname, interval_id, begin, end):
         # normalize to [0,100]
-        normalizer = 100.0 / max(1, max(map(self.weight_fun, self.net._edges)))
-        weights = [(self.weight_fun(e) * normalizer, e.getID()) for e in self.net.getEdges()]
-        weights.sort(reverse=True)
+        normalizer = 100.0 / max(1, self.weights.max())
+        weights = sorted(zip((self.weights * normalizer).tolist(), [e.getID() for e in self.net._edges]),
+                         reverse=True)
         with open(fname, 'w+') as f:
             f.write('<edgedata>\n')
             f.write('    <interval id="%s" begin="%s" end="%s">\n' % (
@@ -373,40 +392,141 @@ class RandomEdgeGenerator:
             f.write('</edgedata>\n')
 
 
+def _retry_outcomes(accepted, maxtries, carry, wanted):
+    """replay the retry loop of get_trip over a stream of candidate accept flags: each trip takes
+    candidates until one is accepted or maxtries were rejected. Returns (outcomes, carry) where
+    outcomes holds the accepted candidate index per trip or -1 for a trip that ran out of tries
+    (at most wanted of them) and carry the rejections already spent by the unfinished trip"""
+    positions = np.flatnonzero(accepted)
+    rejections = np.diff(positions, prepend=-1) - 1
+    if len(positions):
+        rejections[0] += carry
+        tail = len(accepted) - positions[-1] - 1
+    else:
+        tail = len(accepted) + carry
+    per_accept = rejections // maxtries + 1
+    outcomes = np.repeat(positions, per_accept)
+    failed = np.ones(len(outcomes), dtype=bool)
+    failed[np.cumsum(per_accept) - 1] = False
+    outcomes[failed] = -1
+    outcomes = np.concatenate([outcomes, np.full(tail // maxtries, -1, dtype=outcomes.dtype)])
+    return outcomes[:wanted], tail % maxtries
+
+
 class RandomTripGenerator:
 
+    # trips drawn per batch by get_trip
+    BATCH_SIZE = 1024
+    # upper bound for the candidates evaluated at once
+    MAX_CANDIDATES = 1 << 20
+
     def __init__(self, source_generator, sink_generator, via_generator, intermediate, pedestrians):
         self.source_generator = source_generator
         self.sink_generator = sink_generator
         self.via_generator = via_generator
         self.intermediate = intermediate
         self.pedestrians = pedestrians
+        self._edge_data = None
+        self._batch = []
+        self._batch_args = None
 
     def get_trip(self, min_distance, max_distance, maxtries=100, junctionTaz=False, min_dist_fringe=None):
+        args = (min_distance, max_distance, maxtries, junctionTaz, min_dist_fringe)
+        if args != self._batch_args or not self._batch:
+            self._batch = self.get_trips(self.BATCH_SIZE, *args)[::-1]
+            self._batch_args = args
+        trip = self._batch.pop()
+        if trip is None:
+            raise Exception("Warning: no trip found after %s tries" % maxtries)
+        return trip
+
+    def get_trips(self, count, min_distance, max_distance, maxtries=100, junctionTaz=False, min_dist_fringe=None,
+                  rng=None):
+        """draw count trips at once with the distribution of get_trip: candidates are sampled and
+        filtered as arrays, a trip is the first accepted candidate within maxtries tries and falls
+        back to fringe-to-fringe candidates with min_dist_fringe after that. Entries are
+        (source_edge, sink_edge, intermediate) or None where get_trip would have raised"""
+        if rng is None:
+            rng = numpy_rng()
+        edges = self.source_generator.net._edges
+        trips = [None] * count
+        pending = np.arange(count)
         for min_dist in [min_distance, min_dist_fringe]:
-            if min_dist is None:
+            if min_dist is None or maxtries <= 0 or not len(pending):
                 break
-            for _ in range(maxtries):
-                source_edge = self.source_generator.get()
-                intermediate = [self.via_generator.get() for __ in range(self.intermediate)]
-                sink_edge = self.sink_generator.get()
-                is_fringe2fringe = source_edge.is_fringe() and sink_edge.is_fringe() and not intermediate
-                if min_dist == min_dist_fringe and not is_fringe2fringe:
-                    continue
-                if self.pedestrians:
-                    destCoord = sink_edge.getFromNode().getCoord()
-                else:
-                    destCoord = sink_edge.getToNode().getCoord()
-                coords = ([source_edge.getFromNode().getCoord()] +
-                          [e.getFromNode().getCoord() for e in intermediate] +
-                          [destCoord])
-                distance = sum([euclidean(p, q)
-                                for p, q in zip(coords[:-1], coords[1:])])
-                if (distance >= min_dist
-                        and (not junctionTaz or source_edge.getFromNode() != sink_edge.getToNode())
-                        and (max_distance is None or distance < max_distance)):
-                    return source_edge, sink_edge, intermediate
-        raise Exception("Warning: no trip found after %s tries" % maxtries)
+            source, via, sink = self._sample_phase(len(pending), min_dist, max_distance, maxtries, junctionTaz,
+                                                   min_dist == min_dist_fringe, rng)
+            found = source >= 0
+            for trip, s, v, d in zip(pending[found].tolist(), source[found].tolist(), via[found].tolist(),
+                                     sink[found].tolist()):
+                trips[trip] = (edges[s], edges[d], [edges[e] for e in v])
+            pending = pending[~found]
+        return trips
+
+    def _sample_phase(self, wanted, min_dist, max_distance, maxtries, junctionTaz, fringe_only, rng):
+        sources, vias, sinks = [], [], []
+        resolved, carry, rate = 0, 0, 1.
+        while resolved < wanted:
+            block = int(min(max(1.2 * (wanted - resolved) / max(rate, 1. / maxtries), 64), self.MAX_CANDIDATES))
+            source, via, sink = self._candidates(block, rng)
+            accepted = self._accepted(source, via, sink, min_dist, max_distance, junctionTaz, fringe_only)
+            rate = accepted.mean()
+            outcomes, carry = _retry_outcomes(accepted, maxtries, carry, wanted - resolved)
+            hit = outcomes >= 0
+            chosen = outcomes[hit]
+            picked_source = np.full(len(outcomes), -1, dtype=np.int64)
+            picked_via = np.full((len(outcomes), self.intermediate), -1, dtype=np.int64)
+            picked_sink = np.full(len(outcomes), -1, dtype=np.int64)
+            picked_source[hit] = source[chosen]
+            picked_via[hit] = via[chosen]
+            picked_sink[hit] = sink[chosen]
+            sources.append(picked_source)
+            vias.append(picked_via)
+            sinks.append(picked_sink)
+            resolved += len(outcomes)
+        return np.concatenate(sources), np.concatenate(vias), np.concatenate(sinks)
+
+    def _candidates(self, count, rng):
+        source = self.source_generator.get_indices(count, rng)
+        if self.intermediate:
+            via = self.via_generator.get_indices(count * self.intermediate, rng).reshape(count, self.intermediate)
+        else:
+            via = np.zeros((count, 0), dtype=np.int64)
+        sink = self.sink_generator.get_indices(count, rng)
+        return source, via, sink
+
+    def _accepted(self, source, via, sink, min_dist, max_distance, junctionTaz, fringe_only):
+        data = self._get_edge_data()
+        dest = data["from_xy"][sink] if self.pedestrians else data["to_xy"][sink]
+        points = np.concatenate([data["from_xy"][source][:, None], data["from_xy"][via], dest[:, None]], axis=1)
+        legs = np.diff(points, axis=1)
+        distance = np.hypot(legs[..., 0], legs[..., 1]).sum(axis=1)
+        accepted = distance >= min_dist
+        if max_distance is not None:
+            accepted &= distance < max_distance
+        if junctionTaz:
+            accepted &= data["from_node"][source] != data["to_node"][sink]
+        if fringe_only:
+            # fringe to fringe only counts for trips without intermediate edges
+            accepted &= data["fringe"][source] & data["fringe"][sink] & (not self.intermediate)
+        return accepted
+
+    def _get_edge_data(self):
+        """coordinates, node ids and fringe flags of all edges, indexed like net._edges"""
+        if self._edge_data is None:
+            edges = self.source_generator.net._edges
+            nodes = {}
+            from_nodes = [e.getFromNode() for e in edges]
+            to_nodes = [e.getToNode() for e in edges]
+            self._edge_data = {
+                # getCoord() is (x, y, z) on nets with elevation; distances are 2D
+                "from_xy": np.array([n.getCoord()[:2] for n in from_nodes], dtype=np.float64).reshape(-1, 2),
+                "to_xy": np.array([n.getCoord()[:2] for n in to_nodes], dtype=np.float64).reshape(-1, 2),
+                "from_node": np.array([nodes.setdefault(id(n), len(nodes)) for n in from_nodes], dtype=np.int64),
+                "to_node": np.array([nodes.setdefault(id(n), len(nodes)) for n in to_nodes], dtype=np.int64),
+                "fringe": np.array([e.is_fringe() for e in edges], dtype=bool),
+            }
+        return self._edge_data
 
 
 def get_prob_fun(options, fringe_bonus, fringe_forbidden, max_length):
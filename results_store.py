@@ -0,0 +1,131 @@
+import json
+import sqlite3
+import time
+import uuid
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_number INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT UNIQUE NOT NULL,
+    started REAL,
+    rumor_edges TEXT,
+    rumors TEXT,
+    metadata TEXT
+);
+CREATE TABLE IF NOT EXISTS street_crossings (
+    run_id TEXT NOT NULL,
+    edge TEXT NOT NULL,
+    street TEXT,
+    count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_street_crossings_run ON street_crossings (run_id);
+CREATE INDEX IF NOT EXISTS idx_street_crossings_edge ON street_crossings (edge);
+CREATE TABLE IF NOT EXISTS edge_data (
+    run_id TEXT NOT NULL,
+    interval_begin REAL,
+    interval_end REAL,
+    edge TEXT NOT NULL,
+    entered INTEGER,
+    exited INTEGER,
+    traveltime REAL,
+    density REAL,
+    waiting_time REAL,
+    time_loss REAL
+);
+CREATE INDEX IF NOT EXISTS idx_edge_data_run ON edge_data (run_id);
+CREATE TABLE IF NOT EXISTS tripinfo (
+    run_id TEXT NOT NULL,
+    vehicle TEXT NOT NULL,
+    depart REAL,
+    arrival REAL,
+    duration REAL,
+    route_length REAL,
+    time_loss REAL,
+    waiting_time REAL,
+    reroutes INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_tripinfo_run ON tripinfo (run_id);
+"""
+
+
+class ResultsStore:
+    """
+    Append-only, long-format store for simulation results in SQLite.
+
+    Each run inserts one row into `runs` (rumor metadata) and one row per edge into
+    `street_crossings`; nothing is ever rewritten, so a run costs O(edges) I/O no matter how many
+    runs came before. WAL journaling lets several simulation processes append to the same file
+    while readers keep working.
+    """
+
+    def __init__(self, db_file="results.sqlite", timeout=30.0):
+        self.db_file = db_file
+        self.connection = sqlite3.connect(db_file, timeout=timeout)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    @staticmethod
+    def new_run_id():
+        return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+    def record_run(self, street_counts, rumor_edges=None, rumors=None, metadata=None, run_id=None):
+        """
+        Append one run. `street_counts` is an iterable of (edge, street, count).
+        Returns the run id.
+        """
+        run_id = run_id or self.new_run_id()
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO runs (run_id, started, rumor_edges, rumors, metadata) VALUES (?, ?, ?, ?, ?)",
+                (run_id, time.time(), json.dumps(list(rumor_edges or [])), json.dumps(list(rumors or [])),
+                 json.dumps(metadata or {}))
+            )
+            self.connection.executemany(
+                "INSERT INTO street_crossings (run_id, edge, street, count) VALUES (?, ?, ?, ?)",
+                ((run_id, edge, street, int(count)) for edge, street, count in street_counts)
+            )
+        return run_id
+
+    def record_edge_data(self, run_id, rows):
+        """
+        Append SUMO edgeData intervals: rows of
+        (interval_begin, interval_end, edge, entered, exited, traveltime, density, waiting_time, time_loss).
+        """
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO edge_data (run_id, interval_begin, interval_end, edge, entered, exited, traveltime, density, "
+                "waiting_time, time_loss) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ((run_id,) + tuple(row) for row in rows)
+            )
+
+    def record_tripinfo(self, run_id, rows):
+        """
+        Append SUMO tripinfos: rows of
+        (vehicle, depart, arrival, duration, route_length, time_loss, waiting_time, reroutes).
+        """
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO tripinfo (run_id, vehicle, depart, arrival, duration, route_length, time_loss, "
+                "waiting_time, reroutes) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ((run_id,) + tuple(row) for row in rows)
+            )
+
+    def runs(self):
+        """
+        [(run_number, run_id, rumor_edges, rumors, metadata)] in the order the runs were recorded.
+        """
+        rows = self.connection.execute(
+            "SELECT run_number, run_id, rumor_edges, rumors, metadata FROM runs ORDER BY run_number"
+        ).fetchall()
+        return [(n, run_id, json.loads(edges), json.loads(rumors), json.loads(metadata))
+                for n, run_id, edges, rumors, metadata in rows]
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,137 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from statusCodec import (
+    DELTA_CONTENT_TYPE,
+    JSON_CONTENT_TYPE,
+    PACKED_CONTENT_TYPE,
+    apply_delta,
+    unpack_statuses
+)
+
+DEFAULT_SERVER_URL = os.environ.get("RUMOR_SERVER_URL", "http://127.0.0.1:5000")
+
+
+class RumorClient:
+    """
+    Keep-alive client for rumorServer. One pooled requests.Session is shared by every call,
+    so simulation workers reuse TCP connections instead of opening one per request.
+
+    Only connection failures and 503 (batcher queue full) are retried: both happen before the
+    server touched the rumor, so a retried /propagate never advances a rumor twice.
+    """
+
+    def __init__(self, base_url=DEFAULT_SERVER_URL, network_id="default", pool_size=16, retries=3,
+                 backoff_factor=0.2, timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.network_id = network_id
+        self.timeout = timeout
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=0,
+            status=retries,
+            status_forcelist=(503,),
+            allowed_methods=frozenset({"POST"}),
+            backoff_factor=backoff_factor,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # (network_id, rumor) -> (step, status array) of the last binary response, the base for delta responses
+        self._last_statuses = {}
+
+    def _post(self, endpoint, payload, headers=None):
+        payload = {"network_id": self.network_id, **payload}
+        response = self.session.post(f"{self.base_url}/{endpoint}", json=payload, headers=headers,
+                                     timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    def initialize(self, car_total, street_names=None, recovery_delay=None):
+        payload = {"car_total": car_total}
+        if street_names is not None:
+            payload["street_names"] = list(street_names)
+        if recovery_delay is not None:
+            payload["recovery_delay"] = recovery_delay
+        result = self._post("initialize", payload).json()
+        # A fresh network restarts its step count, so old statuses must never serve as a delta base
+        for key in [key for key in self._last_statuses if key[0] == self.network_id]:
+            del self._last_statuses[key]
+        return result
+
+    def propagate(self, rumor, steps=1, wire_format="json"):
+        """
+        Returns the node statuses as {node: state} for wire_format="json", or as a uint8
+        NumPy array indexed by node for the binary formats "packed" and "delta".
+        """
+        if wire_format == "json":
+            response = self._post("propagate", {"rumor": rumor, "steps": steps})
+            return {int(node): state for node, state in response.json().items()}
+
+        headers = {"Accept": PACKED_CONTENT_TYPE}
+        key = (self.network_id, rumor)
+        last = self._last_statuses.get(key)
+        if wire_format == "delta" and last is not None:
+            headers = {"Accept": f"{DELTA_CONTENT_TYPE}, {PACKED_CONTENT_TYPE};q=0.9",
+                       "X-Status-Base-Step": str(last[0])}
+        elif wire_format not in ("packed", "delta"):
+            raise ValueError(f"Unknown wire format {wire_format!r}.")
+
+        response = self._post("propagate", {"rumor": rumor, "steps": steps}, headers=headers)
+        content_type = response.headers.get("Content-Type", JSON_CONTENT_TYPE).split(";")[0]
+        if content_type == DELTA_CONTENT_TYPE:
+            status = apply_delta(response.content, last[1])
+        elif content_type == PACKED_CONTENT_TYPE:
+            status = unpack_statuses(response.content)
+        else:
+            raise ValueError(f"Unexpected content type {content_type!r} for wire format {wire_format!r}.")
+        self._last_statuses[key] = (int(response.headers["X-Rumor-Step"]), status)
+        return status
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AsyncRumorClient:
+    """
+    asyncio variant of RumorClient. Calls run on a small thread pool over the same pooled
+    session, so many coroutines can have requests in flight without blocking the event loop.
+    """
+
+    def __init__(self, base_url=DEFAULT_SERVER_URL, network_id="default", pool_size=16, **kwargs):
+        self.client = RumorClient(base_url, network_id=network_id, pool_size=pool_size, **kwargs)
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="rumor-client")
+
+    async def _call(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: fn(*args, **kwargs))
+
+    async def initialize(self, car_total, street_names=None, recovery_delay=None):
+        return await self._call(self.client.initialize, car_total, street_names, recovery_delay)
+
+    async def propagate(self, rumor, steps=1, wire_format="json"):
+        return await self._call(self.client.propagate, rumor, steps, wire_format)
+
+    async def close(self):
+        self._executor.shutdown(wait=True)
+        self.client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
@@ -0,0 +1,274 @@
+import argparse
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from flask import Flask, jsonify, request
+
+from propagationEngine import PropagationEngine
+from statusCodec import (
+    DELTA_CONTENT_TYPE,
+    JSON_CONTENT_TYPE,
+    PACKED_CONTENT_TYPE,
+    encode_delta,
+    pack_statuses
+)
+
+
+class ServerBusy(Exception):
+    pass
+
+
+class MicroBatcher:
+    """
+    Collects items submitted from many request threads and hands them to `process_batch`
+    in groups. A batch is closed when `max_batch_size` items arrived or `window` seconds
+    passed since its first item, whichever comes first. Items whose future was cancelled
+    (the caller gave up waiting) are dropped before the batch is processed.
+    """
+
+    def __init__(self, process_batch, window=0.005, max_batch_size=64, max_pending=1024):
+        self.process_batch = process_batch
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name="rumor-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        future = Future()
+        try:
+            self._queue.put_nowait((item, future))
+        except queue.Full:
+            raise ServerBusy("Too many pending requests.")
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = [(item, future) for item, future in self._collect() if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            items = [item for item, _ in batch]
+            try:
+                results = self.process_batch(items)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+class RumorService:
+    """
+    State behind the /initialize and /propagate endpoints: one PropagationEngine per social network
+    (every rumor is a row of it) and a warm RumorClassifier shared by all of them.
+    """
+
+    def __init__(self, classify=True, recovery_delay=10, seed=None):
+        self.classify = classify
+        self.recovery_delay = recovery_delay
+        self.seed = seed
+        self.networks = {}
+        self.street_names = {}
+        self.sentiments = {}
+        self._classifier = None
+        self._lock = threading.Lock()
+
+    @property
+    def classifier(self):
+        if self._classifier is None:
+            from LLMmodelRunner import get_rumor_classifier
+            self._classifier = get_rumor_classifier()
+        return self._classifier
+
+    def initialize(self, network_id, car_total, street_names=None, recovery_delay=None):
+        with self._lock:
+            self.networks[network_id] = PropagationEngine(
+                car_total,
+                recovery_delay=self.recovery_delay if recovery_delay is None else recovery_delay,
+                seed=self.seed
+            )
+            self.street_names[network_id] = list(street_names or [])
+        return {"network_id": network_id, "car_total": car_total}
+
+    def _classify(self, network_id, rumors):
+        rumors = [r for r in dict.fromkeys(rumors) if (network_id, r) not in self.sentiments]
+        if not rumors:
+            return
+        if self.classify:
+            results = self.classifier.classify_many(rumors, self.street_names[network_id])
+        else:
+            results = [("negative", [], {}) for _ in rumors]
+        for rumor, (sentiment, relevant_streets, _) in zip(rumors, results):
+            self.sentiments[(network_id, rumor)] = (sentiment, relevant_streets)
+
+    def process_batch(self, items):
+        """
+        items: [{"network_id", "rumor", "steps"}, ...] in arrival order.
+        Requests for the same rumor are applied one after the other, so each one sees the state
+        after its own steps, exactly as if they had been served sequentially.
+        """
+        results = [None] * len(items)
+        with self._lock:
+            by_network = {}
+            for idx, item in enumerate(items):
+                if item["network_id"] not in self.networks:
+                    results[idx] = KeyError(f"Social network {item['network_id']!r} is not initialized.")
+                    continue
+                by_network.setdefault(item["network_id"], []).append(idx)
+
+            for network_id, indices in by_network.items():
+                engine = self.networks[network_id]
+                self._classify(network_id, [items[i]["rumor"] for i in indices])
+
+                # row -> [(steps before, steps after, item index)]
+                targets = {}
+                for i in indices:
+                    rumor = items[i]["rumor"]
+                    sentiment, _ = self.sentiments[(network_id, rumor)]
+                    row = engine.add_rumor(rumor, seed_infection=(sentiment == "negative"))
+                    pending = targets.setdefault(row, [])
+                    done = pending[-1][1] if pending else 0
+                    pending.append((done, done + max(0, int(items[i]["steps"])), i))
+
+                bases = {}
+
+                def snapshot(step):
+                    for row, pending in targets.items():
+                        for before, after, i in pending:
+                            # the state a request starts from is what a delta response is relative to
+                            if before == step:
+                                bases[i] = (engine.status[row].copy(), int(engine.current_step[row]))
+                            if after == step:
+                                results[i] = self._result(network_id, engine, row, items[i]["rumor"], *bases[i])
+
+                snapshot(0)
+                max_steps = max(pending[-1][1] for pending in targets.values())
+                for step in range(1, max_steps + 1):
+                    engine.step([row for row, pending in targets.items() if pending[-1][1] >= step])
+                    snapshot(step)
+        return results
+
+    def _result(self, network_id, engine, row, rumor, base_status, base_step):
+        sentiment, relevant_streets = self.sentiments[(network_id, rumor)]
+        return {
+            "status": engine.status[row].copy(),
+            "step": int(engine.current_step[row]),
+            "base_status": base_status,
+            "base_step": base_step,
+            "sentiment": sentiment,
+            "relevant_streets": relevant_streets,
+        }
+
+
+def create_app(service=None, window=0.005, max_batch_size=64, timeout=60, max_steps=10000):
+    service = service or RumorService()
+    batcher = MicroBatcher(service.process_batch, window=window, max_batch_size=max_batch_size)
+    app = Flask(__name__)
+    app.config["RUMOR_SERVICE"] = service
+
+    @app.post("/initialize")
+    def initialize():
+        payload = request.get_json(force=True)
+        result = service.initialize(
+            str(payload.get("network_id", "default")),
+            int(payload["car_total"]),
+            street_names=payload.get("street_names"),
+            recovery_delay=payload.get("recovery_delay")
+        )
+        return jsonify(result)
+
+    @app.post("/propagate")
+    def propagate():
+        # Validated here so one malformed request can't fail the whole micro-batch it would join
+        payload = request.get_json(force=True, silent=True)
+        if not isinstance(payload, dict):
+            return jsonify({"error": "Expected a JSON object."}), 400
+        network_id = payload.get("network_id", "default")
+        rumor = payload.get("rumor")
+        steps = payload.get("steps", 1)
+        if not isinstance(network_id, (str, int)) or isinstance(network_id, bool):
+            return jsonify({"error": "'network_id' must be a string or an integer."}), 400
+        if not isinstance(rumor, str) or not rumor.strip():
+            return jsonify({"error": "'rumor' must be a non-empty string."}), 400
+        try:
+            steps = int(steps)
+        except (TypeError, ValueError):
+            return jsonify({"error": f"'steps' must be an integer, got {steps!r}."}), 400
+        if steps < 0:
+            return jsonify({"error": "'steps' must not be negative."}), 400
+        if steps > max_steps:
+            return jsonify({"error": f"'steps' must be at most {max_steps}, got {steps}."}), 400
+        item = {"network_id": str(network_id), "rumor": rumor, "steps": steps}
+        try:
+            future = batcher.submit(item)
+        except ServerBusy as e:
+            return jsonify({"error": str(e)}), 503
+        try:
+            result = future.result(timeout=timeout)
+        except FutureTimeout:
+            # still queued: the batcher skips it; already running: its batch finishes regardless
+            future.cancel()
+            return jsonify({"error": f"Propagation did not finish within {timeout}s."}), 504
+        if isinstance(result, Exception):
+            return jsonify({"error": str(result)}), 404
+
+        # Binary formats are negotiated through Accept; a delta is only sent when the client's
+        # X-Status-Base-Step matches the state this request started from, otherwise it gets the full array.
+        wire_format = request.accept_mimetypes.best_match(
+            [JSON_CONTENT_TYPE, PACKED_CONTENT_TYPE, DELTA_CONTENT_TYPE], default=JSON_CONTENT_TYPE
+        )
+        if wire_format == DELTA_CONTENT_TYPE and request.headers.get("X-Status-Base-Step") != str(result["base_step"]):
+            wire_format = PACKED_CONTENT_TYPE
+
+        body = None
+        if wire_format == DELTA_CONTENT_TYPE:
+            body = encode_delta(result["base_status"], result["status"])
+            # when most nodes changed the full packed array is smaller than the delta
+            if len(body) > 4 + -(-len(result["status"]) // 4):
+                wire_format = PACKED_CONTENT_TYPE
+
+        if wire_format == DELTA_CONTENT_TYPE:
+            response = app.response_class(body, mimetype=DELTA_CONTENT_TYPE)
+        elif wire_format == PACKED_CONTENT_TYPE:
+            response = app.response_class(pack_statuses(result["status"]), mimetype=PACKED_CONTENT_TYPE)
+        else:
+            response = jsonify(dict(enumerate(result["status"].tolist())))
+        response.headers["X-Rumor-Step"] = str(result["step"])
+        response.headers["X-Rumor-Sentiment"] = result["sentiment"]
+        response.headers["X-Relevant-Streets"] = json.dumps(result["relevant_streets"])
+        return response
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local rumor classification/propagation server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--window", type=float, default=0.005, help="micro-batch window in seconds")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-steps", type=int, default=10000, help="largest 'steps' one request may ask for")
+    parser.add_argument("--no-classifier", action="store_true",
+                        help="skip the LLM and treat every rumor as negative")
+    args = parser.parse_args()
+
+    app = create_app(RumorService(classify=not args.no_classifier), window=args.window,
+                     max_batch_size=args.max_batch_size, max_steps=args.max_steps)
+    app.run(host=args.host, port=args.port, threaded=True)
@@ -0,0 +1,58 @@
+import struct
+
+import numpy as np
+
+JSON_CONTENT_TYPE = "application/json"
+# uint32 node count, then 4 statuses per byte (node i in bits 2*(i % 4))
+PACKED_CONTENT_TYPE = "application/x-rumor-status-packed"
+# uint32 node count, uint32 change count, uint32 indices[count], uint8 statuses[count]
+DELTA_CONTENT_TYPE = "application/x-rumor-status-delta"
+
+_SHIFTS = np.array([0, 2, 4, 6], dtype=np.uint8)
+
+
+def pack_statuses(status):
+    """
+    Encode a status array (values 0-2) at 2 bits per node.
+    """
+    status = np.asarray(status, dtype=np.uint8)
+    node_count = status.size
+    padded = np.zeros(-(-node_count // 4) * 4, dtype=np.uint8)
+    padded[:node_count] = status
+    packed = np.bitwise_or.reduce(padded.reshape(-1, 4) << _SHIFTS, axis=1).astype(np.uint8)
+    return struct.pack("<I", node_count) + packed.tobytes()
+
+
+def unpack_statuses(payload):
+    """
+    Decode pack_statuses() output straight into a uint8 NumPy array.
+    """
+    (node_count,) = struct.unpack_from("<I", payload)
+    packed = np.frombuffer(payload, dtype=np.uint8, offset=4)
+    return ((packed[:, None] >> _SHIFTS) & 3).reshape(-1)[:node_count]
+
+
+def encode_delta(base, status):
+    """
+    Encode only the nodes whose status differs from `base`.
+    """
+    base = np.asarray(base, dtype=np.uint8)
+    status = np.asarray(status, dtype=np.uint8)
+    changed = np.flatnonzero(base != status)
+    return (struct.pack("<II", status.size, changed.size)
+            + changed.astype("<u4").tobytes()
+            + status[changed].tobytes())
+
+
+def apply_delta(payload, base):
+    """
+    Apply encode_delta() output to a copy of `base` and return the new status array.
+    """
+    node_count, change_count = struct.unpack_from("<II", payload)
+    if len(base) != node_count:
+        raise ValueError(f"Delta is for {node_count} nodes, base has {len(base)}.")
+    indices = np.frombuffer(payload, dtype="<u4", count=change_count, offset=8)
+    values = np.frombuffer(payload, dtype=np.uint8, count=change_count, offset=8 + 4 * change_count)
+    status = np.array(base, dtype=np.uint8)
+    status[indices] = values
+    return status
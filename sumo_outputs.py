@@ -0,0 +1,92 @@
+import gzip
+import os
+import xml.etree.ElementTree as ET
+
+EDGE_DATA_FIELDS = ("entered", "left", "traveltime", "density", "waitingTime", "timeLoss")
+TRIPINFO_FIELDS = ("depart", "arrival", "duration", "routeLength", "timeLoss", "waitingTime", "rerouteNo")
+
+
+def sumo_output_options(output_dir, period=None, compress=True, additional_files=()):
+    """
+    Extra SUMO command-line options that make SUMO write edgeData meandata and tripinfo output
+    into `output_dir`, plus the paths of those two files. `period` (seconds) splits edgeData into
+    intervals; None writes one interval for the whole run. SUMO accepts --additional-files only
+    once, so other additional files (e.g. polygons) must be passed in `additional_files`.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    suffix = ".xml.gz" if compress else ".xml"
+    edgedata_file = os.path.join(output_dir, "edgedata" + suffix)
+    tripinfo_file = os.path.join(output_dir, "tripinfo" + suffix)
+    additional_file = os.path.join(output_dir, "edgedata.add.xml")
+
+    root = ET.Element("additional")
+    attrib = {"id": "street_stats", "file": os.path.abspath(edgedata_file)}
+    if period is not None:
+        attrib["period"] = str(period)
+    ET.SubElement(root, "edgeData", attrib=attrib)
+    ET.ElementTree(root).write(additional_file)
+
+    options = ["--additional-files", ",".join(list(additional_files) + [additional_file]),
+               "--tripinfo-output", tripinfo_file]
+    return options, edgedata_file, tripinfo_file
+
+
+def _open(path):
+    with open(path, "rb") as f:
+        magic = f.read(2)
+    return gzip.open(path, "rb") if magic == b"\x1f\x8b" else open(path, "rb")
+
+
+def iter_edge_data(path):
+    """
+    Stream (begin, end, edge_id, {field: value}) from an edgeData file without loading it whole.
+    """
+    begin = end = None
+    with _open(path) as f:
+        for event, element in ET.iterparse(f, events=("start", "end")):
+            if event == "start":
+                if element.tag == "interval":
+                    begin, end = float(element.get("begin")), float(element.get("end"))
+                continue
+            if element.tag == "edge":
+                yield begin, end, element.get("id"), {
+                    field: float(element.get(field)) if element.get(field) is not None else None
+                    for field in EDGE_DATA_FIELDS
+                }
+                element.clear()
+            elif element.tag == "interval":
+                element.clear()
+
+
+def iter_tripinfo(path):
+    """
+    Stream (vehicle_id, {field: value}) from a tripinfo file.
+    """
+    with _open(path) as f:
+        for _, element in ET.iterparse(f, events=("end",)):
+            if element.tag != "tripinfo":
+                continue
+            yield element.get("id"), {
+                field: float(element.get(field)) if element.get(field) is not None else None
+                for field in TRIPINFO_FIELDS
+            }
+            element.clear()
+
+
+def ingest_sumo_outputs(store, run_id, edgedata_file, tripinfo_file=None):
+    """
+    Append the edgeData intervals and tripinfos of a finished run to the results store.
+    Returns {edge_id: vehicles entered over the whole run}.
+    """
+    entered = {}
+
+    def edge_rows():
+        for begin, end, edge_id, values in iter_edge_data(edgedata_file):
+            entered[edge_id] = entered.get(edge_id, 0) + int(values["entered"] or 0)
+            yield (begin, end, edge_id) + tuple(values[field] for field in EDGE_DATA_FIELDS)
+
+    store.record_edge_data(run_id, edge_rows())
+    if tripinfo_file is not None and os.path.exists(tripinfo_file):
+        store.record_tripinfo(run_id, ((vehicle_id,) + tuple(values[field] for field in TRIPINFO_FIELDS)
+                                       for vehicle_id, values in iter_tripinfo(tripinfo_file)))
+    return entered
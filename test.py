@@ -1,32 +1,34 @@
 import requests
 
+from rumorClient import DEFAULT_SERVER_URL, RumorClient
+
 # Server Configuration
-SERVER_IP = "http://130.18.208.34:5000"
+# Start a local server with `python rumorServer.py`, or point RUMOR_SERVER_URL at a shared one.
+SERVER_IP = DEFAULT_SERVER_URL
 
+# One pooled, keep-alive client shared by every call below.
+client = RumorClient(SERVER_IP)
 
-# Replace 'your-server-ip' with the actual IP or domain.
 
 # Initialize the social network
-def initialize_social_network_on_server(car_total):
+def initialize_social_network_on_server(car_total, street_names=None):
     try:
-        response = requests.post(f"{SERVER_IP}/initialize", json={"car_total": car_total})
-        if response.status_code == 200:
-            print("Social network initialized:", response.json())
-        else:
-            print("Failed to initialize social network:", response.text)
+        print("Social network initialized:", client.initialize(car_total, street_names=street_names))
+    except requests.exceptions.HTTPError as e:
+        print("Failed to initialize social network:", e.response.text)
     except requests.exceptions.RequestException as e:
         print("Error while trying to connect to the server:", e)
 
 
 # Propagate the rumor
-def propagate_rumor_on_server(rumor, steps=1):
+# wire_format="packed" or "delta" returns a NumPy status array decoded from the binary response.
+def propagate_rumor_on_server(rumor, steps=1, wire_format="json"):
     try:
-        response = requests.post(f"{SERVER_IP}/propagate", json={"rumor": rumor, "steps": steps})
-        if response.status_code == 200:
-            print("Rumor propagated successfully.")
-            return response.json()  # Returns the statuses
-        else:
-            print("Failed to propagate rumor:", response.text)
+        statuses = client.propagate(rumor, steps=steps, wire_format=wire_format)
+        print("Rumor propagated successfully.")
+        return statuses  # Returns the statuses
+    except requests.exceptions.HTTPError as e:
+        print("Failed to propagate rumor:", e.response.text)
     except requests.exceptions.RequestException as e:
         print("Error while trying to connect to the server:", e)
     return {}
@@ -0,0 +1,86 @@
+import csv
+import glob
+import os
+import time
+import uuid
+
+import numpy as np
+
+
+class VoltageRecorder:
+    """
+    Bus voltage magnitudes per time step, stored column by column.
+
+    Steps are written into a preallocated bus x `chunk_steps` buffer that is flushed to a compressed
+    .npz chunk when full, so recording a step is one column write and nothing already on disk is
+    read back. The wide node_stats CSV is produced once, by export_csv, at the end of a run.
+
+    Every recorder writes to its own `output_dir/<run_id>` directory, so earlier or concurrent
+    runs sharing `output_dir` are never touched.
+    """
+
+    def __init__(self, buses, output_dir="voltages", chunk_steps=256, dtype=np.float32, run_id=None):
+        self.buses = list(buses)
+        self.run_id = run_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.output_dir = os.path.join(output_dir, self.run_id)
+        self.chunk_steps = chunk_steps
+        self.buffer = np.zeros((len(self.buses), chunk_steps), dtype=dtype)
+        self.steps = []
+        self.filled = 0
+        self.chunks = 0
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    def record(self, t, values):
+        """
+        Store one step; `values` are in bus order.
+        """
+        self.buffer[:, self.filled] = values
+        self.steps.append(t)
+        self.filled += 1
+        if self.filled == self.chunk_steps:
+            self.flush()
+
+    def flush(self):
+        if not self.filled:
+            return
+        np.savez_compressed(
+            os.path.join(self.output_dir, f"chunk_{self.chunks:05d}.npz"),
+            buses=np.array(self.buses, dtype=str),
+            steps=np.array(self.steps[-self.filled:]),
+            v_mag_pu=self.buffer[:, :self.filled]
+        )
+        self.chunks += 1
+        self.filled = 0
+
+    def close(self):
+        self.flush()
+
+    def export_csv(self, csv_file="node_stats.csv"):
+        """
+        Write the wide CSV: one row per bus, one "T=t" column per recorded step.
+        """
+        self.flush()
+        buses, steps, v_mag_pu = load_voltages(self.output_dir)
+        if not steps:
+            buses, v_mag_pu = self.buses, np.zeros((len(self.buses), 0))
+        with open(csv_file, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Node"] + [f"T={t}" for t in steps])
+            for bus, row in zip(buses, v_mag_pu):
+                writer.writerow([bus] + [f"{v:.3f}" for v in row])
+
+
+def load_voltages(output_dir):
+    """
+    Returns (buses, steps, v_mag_pu) with v_mag_pu a bus x step array, read from all flushed chunks.
+    """
+    chunks = sorted(glob.glob(os.path.join(output_dir, "chunk_*.npz")))
+    if not chunks:
+        return [], [], np.zeros((0, 0))
+    buses, steps, values = None, [], []
+    for path in chunks:
+        with np.load(path) as chunk:
+            buses = list(chunk["buses"])
+            steps.extend(chunk["steps"].tolist())
+            values.append(chunk["v_mag_pu"])
+    return buses, steps, np.concatenate(values, axis=1)